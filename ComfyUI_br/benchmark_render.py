@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Render benchmark: synthetic curtain scene, CPU matrix, JSON history with regression flags
+Runs on machines without a GPU (all renders use the CPU device)
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import importlib
+import statistics
+import subprocess
+
+import numpy as np
+import torch
+
+NODE_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_PATH = os.environ.get("BLENDER_BENCH_HISTORY", os.path.join(NODE_DIR, "benchmark_history.json"))
+SCENE_DIR = os.environ.get("BLENDER_BENCH_SCENES", os.path.join(NODE_DIR, "benchmark_scenes"))
+# A case is flagged when its median wall time exceeds the baseline median by this fraction
+REGRESSION_THRESHOLD = float(os.environ.get("BLENDER_BENCH_THRESHOLD", "0.15"))
+# Number of earlier runs (same machine, Blender and case) the baseline is taken from
+BASELINE_RUNS = 5
+SCENE_VERSION = 1
+
+# Runs inside Blender: two textured curtain grids (cur_1, cur_2), a sun and the default camera
+SCENE_SCRIPT = '''
+import sys, math, bpy
+out_path, width, height = sys.argv[sys.argv.index("--") + 1:][:3]
+bpy.ops.wm.read_factory_settings(use_empty=True)
+scene = bpy.context.scene
+scene.render.engine = 'CYCLES'
+scene.cycles.device = 'CPU'
+scene.render.resolution_x = int(width)
+scene.render.resolution_y = int(height)
+scene.render.resolution_percentage = 100
+
+for index, name in enumerate(["cur_1", "cur_2"]):
+    bpy.ops.mesh.primitive_grid_add(x_subdivisions=64, y_subdivisions=64, size=2.0,
+                                    location=(index * 2.1 - 1.05, 0.0, 1.0), rotation=(math.pi / 2, 0.0, 0.0))
+    obj = bpy.context.active_object
+    obj.name = name
+    for vertex in obj.data.vertices:
+        vertex.co.z = 0.08 * math.sin(vertex.co.x * 12.0)
+    material = bpy.data.materials.new(name + "_mat")
+    material.use_nodes = True
+    nodes, links = material.node_tree.nodes, material.node_tree.links
+    principled = nodes.get("Principled BSDF")
+    coords = nodes.new('ShaderNodeTexCoord')
+    mapping = nodes.new('ShaderNodeMapping')
+    texture = nodes.new('ShaderNodeTexImage')
+    links.new(coords.outputs['UV'], mapping.inputs['Vector'])
+    links.new(mapping.outputs['Vector'], texture.inputs['Vector'])
+    links.new(texture.outputs['Color'], principled.inputs['Base Color'])
+    obj.data.materials.append(material)
+
+bpy.ops.object.light_add(type='SUN', location=(0.0, -4.0, 4.0), rotation=(math.radians(50), 0.0, 0.0))
+bpy.ops.object.camera_add(location=(0.0, -6.0, 1.0), rotation=(math.pi / 2, 0.0, 0.0))
+camera = bpy.context.active_object
+camera.name = "Camera.006"
+scene.camera = camera
+bpy.ops.wm.save_as_mainfile(filepath=out_path)
+'''
+
+
+def load_node_module():
+    """Import blender_node as part of its package, so its relative imports resolve"""
+    sys.path.insert(0, os.path.dirname(NODE_DIR))
+    package = os.path.basename(NODE_DIR)
+    return importlib.import_module(f"{package}.blender_node"), importlib.import_module(f"{package}.render_pool")
+
+
+def synthetic_scene(blender_path, width, height):
+    """Path of the synthetic scene at this resolution, generated on first use"""
+    os.makedirs(SCENE_DIR, exist_ok=True)
+    path = os.path.join(SCENE_DIR, f"synthetic_v{SCENE_VERSION}_{width}x{height}.blend")
+    if not os.path.exists(path):
+        print(f"Generating synthetic scene {os.path.basename(path)}")
+        result = subprocess.run([blender_path, "-b", "--factory-startup", "--python-expr", SCENE_SCRIPT,
+                                 "--", path, str(width), str(height)], capture_output=True, text=True, timeout=120)
+        if result.returncode != 0 or not os.path.exists(path):
+            raise RuntimeError(f"Scene generation failed (exit code {result.returncode}):\n{result.stderr[-2000:]}")
+    return path
+
+
+def synthetic_texture(batch, size=512):
+    """Deterministic [B,H,W,3] stripe texture batch"""
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    frames = []
+    for index in range(batch):
+        phase = index * 0.25
+        frames.append(np.stack([0.5 + 0.5 * np.sin((x + phase) * 20.0),
+                                0.5 + 0.5 * np.sin((y + phase) * 14.0),
+                                np.full_like(x, (0.3 + 0.1 * index) % 1.0)], axis=-1))
+    return torch.from_numpy(np.stack(frames))
+
+
+def parse_list(value, cast=int):
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+
+def case_key(case):
+    return f"{case['mode']}/{case['resolution']}/s{case['samples']}/{'dn' if case['denoise'] else 'raw'}/b{case['batch']}"
+
+
+def run_case(node, blend_file, texture, case, repeats):
+    """Render one matrix cell `repeats` times; returns timings, per-phase medians and throughput"""
+    kwargs = dict(blend_file=blend_file, diffuse_texture=texture, use_gpu=False, samples=case["samples"],
+                  use_denoising=case["denoise"], adaptive_sampling=False, use_cache=False,
+                  persistent_worker=case["mode"] == "warm")
+    if case["mode"] == "warm":
+        node.render(**kwargs)  # Start the worker and load the scene outside the measurement
+
+    walls, reports = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _, report, _ = node.render(**kwargs)
+        walls.append(time.perf_counter() - start)
+        reports.append(json.loads(report))
+
+    phases = {}
+    for report in reports:
+        for group in ("timings", "render_phases"):
+            for name, seconds in (report.get(group) or {}).items():
+                phases.setdefault(f"{group}.{name}", []).append(seconds)
+    wall = statistics.median(walls)
+    return {
+        "wall_seconds": [round(seconds, 4) for seconds in walls],
+        "wall_median": round(wall, 4),
+        "frames_per_second": round(case["batch"] / wall, 4),
+        "phases": {name: round(statistics.median(values), 4) for name, values in phases.items()},
+        "peak_memory_mb": reports[-1].get("peak_memory_mb"),
+    }
+
+
+def load_history(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"version": 1, "runs": []}
+
+
+def flag_regressions(history, run, threshold):
+    """Mark cases whose median is slower than the baseline of earlier comparable runs"""
+    earlier = [previous for previous in history["runs"]
+               if previous["machine"] == run["machine"] and previous["blender_version"] == run["blender_version"]]
+    regressions = []
+    for key, result in run["cases"].items():
+        samples = [previous["cases"][key]["wall_median"] for previous in earlier[-BASELINE_RUNS:]
+                   if "wall_median" in previous["cases"].get(key, {})]
+        if not samples:
+            continue
+        baseline = statistics.median(samples)
+        change = result["wall_median"] / baseline - 1.0
+        result["baseline_median"] = round(baseline, 4)
+        result["change"] = round(change, 4)
+        result["regression"] = change > threshold
+        if result["regression"]:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BlenderRenderNode on CPU with a synthetic scene")
+    parser.add_argument("--samples", default="16,64")
+    parser.add_argument("--resolutions", default="320x180,960x540")
+    parser.add_argument("--denoise", default="off,on", help="off, on or off,on")
+    parser.add_argument("--modes", default="cold,warm", help="cold, warm or cold,warm")
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 2 on a regression")
+    args = parser.parse_args()
+
+    print("=== Blender Render Benchmark (CPU) ===")
+    blender_node, render_pool = load_node_module()
+    blender_path = blender_node.get_default_blender_path()
+    version = subprocess.run([blender_path, "--version"], capture_output=True, text=True,
+                             timeout=10).stdout.split('\n')[0]
+    print(f"Blender: {version}")
+
+    node = blender_node.BlenderRenderNode()
+    texture = synthetic_texture(args.batch)
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": f"{platform.node()}/{platform.machine()}/{os.cpu_count()}cpu",
+        "blender_version": version,
+        "repeats": args.repeats,
+        "cases": {},
+    }
+
+    for resolution in args.resolutions.split(","):
+        width, height = (int(value) for value in resolution.lower().split("x"))
+        blend_file = synthetic_scene(blender_path, width, height)
+        for mode in args.modes.split(","):
+            for samples in parse_list(args.samples):
+                for denoise in args.denoise.split(","):
+                    case = {"mode": mode, "resolution": resolution, "samples": samples,
+                            "denoise": denoise == "on", "batch": args.batch}
+                    key = case_key(case)
+                    try:
+                        result = run_case(node, blend_file, texture, case, args.repeats)
+                    except Exception as e:
+                        print(f"❌ {key}: {e}")
+                        result = {"error": str(e)}
+                    else:
+                        print(f"✅ {key}: {result['wall_median']:.3f}s median, {result['frames_per_second']:.2f} frames/s")
+                    run["cases"][key] = dict(case, **result)
+            # Free the warm workers of this scene before the next resolution
+            render_pool.shutdown_pools()
+
+    history = load_history(args.history)
+    measured = {key: result for key, result in run["cases"].items() if "error" not in result}
+    regressions = flag_regressions(history, dict(run, cases=measured), args.threshold)
+    history["runs"].append(run)
+    with open(args.history, "w") as f:
+        json.dump(history, f, indent=2)
+    print(f"History: {args.history} ({len(history['runs'])} run(s))")
+
+    for key in regressions:
+        result = run["cases"][key]
+        print(f"⚠️ Regression {key}: {result['wall_median']:.3f}s vs baseline {result['baseline_median']:.3f}s "
+              f"(+{result['change'] * 100:.0f}%)")
+    failed = [key for key, result in run["cases"].items() if "error" in result]
+    if failed:
+        return 1
+    return 2 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,22 @@
 """
 Simple Blender Auto-Downloader for Windows and Linux only
+
+Downloads byte ranges in parallel (resuming partial downloads), verifies the
+archive's SHA-256, extracts the tar.xz while it is still downloading, and
+installs into a shared, versioned cache that several node installs can reuse.
 """
 import os
+import io
+import json
+import shutil
+import hashlib
 import platform
+import tempfile
+import threading
 import urllib.request
 import zipfile
 import tarfile
+from concurrent.futures import ThreadPoolExecutor
 
 # Simple configuration - only Windows and Linux
 BLENDER_VERSION = "4.5.3"
@@ -13,6 +24,7 @@ DOWNLOAD_URLS = {
     "Windows": f"https://download.blender.org/release/Blender4.5/blender-{BLENDER_VERSION}-windows-x64.zip",
     "Linux": f"https://download.blender.org/release/Blender4.5/blender-{BLENDER_VERSION}-linux-x64.tar.xz"
 }
+CHECKSUM_URL = f"https://download.blender.org/release/Blender4.5/blender-{BLENDER_VERSION}.sha256"
 
 # Use shorter names for easier access (following Linux guide recommendation)
 EXTRACT_FOLDERS = {
@@ -20,11 +32,24 @@ EXTRACT_FOLDERS = {
     "Linux": "blender"  # Renamed to shorter "blender" folder for Linux convenience
 }
 
+# Top-level folder inside the official archives (and the shared cache install folder)
+ARCHIVE_FOLDERS = {
+    "Windows": f"blender-{BLENDER_VERSION}-windows-x64",
+    "Linux": f"blender-{BLENDER_VERSION}-linux-x64"
+}
+
 BLENDER_EXECUTABLES = {
     "Windows": "blender.exe",
     "Linux": "blender"  # Linux executable inside the blender folder
 }
 
+# Shared install cache, reused by every node install on the machine
+CACHE_DIR = os.environ.get("BLENDER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "comfyui_blender"))
+DOWNLOAD_WORKERS = int(os.environ.get("BLENDER_DOWNLOAD_WORKERS", "8"))
+CHUNK_SIZE = int(os.environ.get("BLENDER_DOWNLOAD_CHUNK_MB", "16")) * 1024 * 1024
+READ_SIZE = 256 * 1024
+REQUEST_TIMEOUT = 60
+
 def get_platform():
     """Get current platform (Windows or Linux only)"""
     system = platform.system()
@@ -35,88 +60,341 @@ def get_platform():
     else:
         raise Exception(f"Unsupported platform: {system}. Only Windows and Linux are supported.")
 
+def _cache_lock(cache_dir, name):
+    """Exclusive inter-process lock so concurrent installs don't download twice"""
+    os.makedirs(cache_dir, exist_ok=True)
+    lock_file = open(os.path.join(cache_dir, f".{name}.lock"), "a+")
+    try:
+        import fcntl
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+    except ImportError:
+        import msvcrt
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+    return lock_file
+
+def fetch_expected_sha256(checksum_url, filename):
+    """SHA-256 for `filename` from BLENDER_SHA256 or the release's .sha256 listing"""
+    if os.environ.get("BLENDER_SHA256"):
+        return os.environ["BLENDER_SHA256"].strip().lower()
+    try:
+        with urllib.request.urlopen(checksum_url, timeout=REQUEST_TIMEOUT) as response:
+            listing = response.read().decode("utf-8", "replace")
+    except Exception as e:
+        print(f"Warning: Could not fetch Blender checksums from {checksum_url}: {e}")
+        return None
+    for line in listing.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[-1].lstrip("*") == filename:
+            return parts[0].lower()
+    print(f"Warning: No checksum for {filename} in {checksum_url}")
+    return None
+
+class RangeDownload:
+    """Parallel, resumable download of `url` into `path`.
+
+    Chunks are fetched with HTTP Range requests (in order, by a thread pool)
+    and written in place. Completed chunks are recorded in `path + ".json"`,
+    so an interrupted download resumes where it stopped. The contiguous
+    downloaded prefix is tracked so a reader can consume the file while it
+    is still being written.
+    """
+
+    def __init__(self, url, path, workers=DOWNLOAD_WORKERS, chunk_size=CHUNK_SIZE):
+        self.url = url
+        self.path = path
+        self.state_path = path + ".json"
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        self.total = None
+        self.ranges = False
+        self.error = None
+        self.finished = False
+        self._progress = []
+        self._condition = threading.Condition()
+        self._reported = 0
+
+    def _probe(self):
+        request = urllib.request.Request(self.url, method="HEAD")
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                length = response.headers.get("Content-Length")
+                self.total = int(length) if length else None
+                self.ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+        except Exception as e:
+            print(f"Warning: HEAD request failed ({e}); downloading as a single stream")
+
+    def _chunks(self):
+        if not self.ranges or not self.total:
+            return [(0, None)]
+        return [(start, min(start + self.chunk_size, self.total) - 1)
+                for start in range(0, self.total, self.chunk_size)]
+
+    def _load_state(self, chunks):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        if (state.get("url") != self.url or state.get("total") != self.total
+                or state.get("chunk_size") != self.chunk_size or not os.path.exists(self.path)):
+            return set()
+        return set(state.get("done", [])) & set(range(len(chunks)))
+
+    def _save_state(self, done):
+        state = {"url": self.url, "total": self.total, "chunk_size": self.chunk_size, "done": sorted(done)}
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.state_path)
+
+    def available(self):
+        """Bytes from the start of the file that are fully downloaded"""
+        with self._condition:
+            return self._available_locked()
+
+    def _available_locked(self):
+        total = 0
+        for (start, end), done in zip(self._chunks_list, self._progress):
+            total += done
+            if end is None or done < end - start + 1:
+                break
+        return total
+
+    def _fetch(self, index, done):
+        start, end = self._chunks_list[index]
+        headers = {"Range": f"bytes={start}-{end}"} if end is not None else {}
+        request = urllib.request.Request(self.url, headers=headers)
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response, open(self.path, "r+b") as f:
+            if end is not None and response.status != 206:
+                raise IOError(f"Server ignored the range request for bytes {start}-{end}")
+            f.seek(start)
+            while True:
+                data = response.read(READ_SIZE)
+                if not data:
+                    break
+                f.write(data)
+                f.flush()
+                with self._condition:
+                    self._progress[index] += len(data)
+                    self._condition.notify_all()
+                self._report()
+
+        expected = end - start + 1 if end is not None else None
+        with self._condition:
+            if expected is not None and self._progress[index] != expected:
+                raise IOError(f"Incomplete chunk {start}-{end}: got {self._progress[index]} of {expected} bytes")
+            done.add(index)
+            if end is not None:
+                self._save_state(done)
+
+    def _report(self):
+        if not self.total:
+            return
+        with self._condition:
+            downloaded = sum(self._progress)
+            step = downloaded * 10 // self.total
+            if step > self._reported:
+                self._reported = step
+                print(f"Downloading Blender: {step * 10}% ({downloaded // (1024 * 1024)} / {self.total // (1024 * 1024)} MB)")
+
+    def run(self):
+        """Download all missing chunks; errors are stored in self.error and re-raised"""
+        try:
+            self._probe()
+            self._chunks_list = self._chunks()
+            done = self._load_state(self._chunks_list) if self.ranges else set()
+
+            mode = "r+b" if done else "wb"
+            with open(self.path, mode) as f:
+                if self.total:
+                    f.truncate(self.total)
+            self._progress = [
+                (end - start + 1) if index in done else 0
+                for index, (start, end) in enumerate(self._chunks_list)
+            ]
+            if done:
+                print(f"Resuming Blender download: {len(done)}/{len(self._chunks_list)} chunks already present")
+
+            pending = [i for i in range(len(self._chunks_list)) if i not in done]
+            with ThreadPoolExecutor(max_workers=min(self.workers, max(1, len(pending)))) as pool:
+                for future in [pool.submit(self._fetch, index, done) for index in pending]:
+                    future.result()
+        except BaseException as e:
+            with self._condition:
+                self.error = e
+                self._condition.notify_all()
+            raise
+        finally:
+            with self._condition:
+                self.finished = True
+                self._condition.notify_all()
+
+    def wait_for(self, position):
+        """Block until `position` bytes are available; returns False at end of file"""
+        with self._condition:
+            while True:
+                if self.error is not None:
+                    raise IOError(f"Blender download failed: {self.error}")
+                if not self._progress and not self.finished:
+                    self._condition.wait()
+                    continue
+                available = self._available_locked() if self._progress else 0
+                if available > position:
+                    return True
+                if self.finished:
+                    return False
+                self._condition.wait()
+
+    def cleanup(self):
+        for path in (self.path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+class StreamingReader(io.RawIOBase):
+    """Sequential reader over a file that is still being downloaded, hashing what it reads"""
+
+    def __init__(self, download):
+        self.download = download
+        self.position = 0
+        self.sha256 = hashlib.sha256()
+        self._file = None
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self.download.wait_for(self.position):
+            return 0
+        if self._file is None:
+            self._file = open(self.download.path, "rb")
+        available = self.download.available() - self.position
+        self._file.seek(self.position)
+        data = self._file.read(min(len(buffer), available))
+        buffer[:len(data)] = data
+        self.position += len(data)
+        self.sha256.update(data)
+        return len(data)
+
+    def drain(self):
+        """Read (and hash) whatever the consumer left unread"""
+        while self.read(READ_SIZE):
+            pass
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        super().close()
+
+def _extract_member(tar_ref, member, destination):
+    if hasattr(tarfile, "data_filter"):
+        tar_ref.extract(member, destination, filter="data")
+    else:
+        tar_ref.extract(member, destination)
+
+def download_and_install(url, install_root, archive_folder, checksum_url=None, workers=DOWNLOAD_WORKERS):
+    """Download `url`, verify it and install its `archive_folder` into `install_root`.
+
+    tar.xz archives are extracted while they download. Returns the install path.
+    """
+    filename = url.split("/")[-1]
+    install_path = os.path.join(install_root, archive_folder)
+    if os.path.isdir(install_path):
+        return install_path
+
+    expected_sha256 = fetch_expected_sha256(checksum_url, filename) if checksum_url else os.environ.get("BLENDER_SHA256")
+    download = RangeDownload(url, os.path.join(install_root, filename + ".part"), workers=workers)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=install_root)
+
+    try:
+        streaming = filename.endswith((".tar.xz", ".tar.gz", ".tar.bz2", ".tar"))
+        downloader = threading.Thread(target=lambda: _run_quietly(download), daemon=True)
+        downloader.start()
+
+        reader = StreamingReader(download)
+        if streaming:
+            print(f"Extracting {filename} while downloading...")
+            with tarfile.open(fileobj=reader, mode="r|*") as tar_ref:
+                for member in tar_ref:
+                    _extract_member(tar_ref, member, staging)
+        reader.drain()
+        reader.close()
+        downloader.join()
+        if download.error is not None:
+            raise download.error
+
+        actual_sha256 = reader.sha256.hexdigest()
+        if expected_sha256 and actual_sha256 != expected_sha256:
+            download.cleanup()
+            raise IOError(f"SHA-256 mismatch for {filename}: expected {expected_sha256}, got {actual_sha256}")
+        print(f"Verified SHA-256: {actual_sha256}" if expected_sha256 else f"SHA-256 (unverified): {actual_sha256}")
+
+        if not streaming:
+            print(f"Extracting {filename}...")
+            with zipfile.ZipFile(download.path, 'r') as zip_ref:
+                zip_ref.extractall(staging)
+
+        extracted = os.path.join(staging, archive_folder)
+        if not os.path.isdir(extracted):
+            raise IOError(f"Archive {filename} does not contain {archive_folder}/")
+        os.rename(extracted, install_path)
+        download.cleanup()
+        return install_path
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+def _run_quietly(download):
+    try:
+        download.run()
+    except BaseException:
+        pass  # Surfaced to the consumer through download.error
+
 def download_blender(node_dir):
-    """Download and extract Blender for current platform"""
+    """Download and install Blender for current platform into the shared cache"""
     current_platform = get_platform()
-    url = DOWNLOAD_URLS[current_platform]
-    extract_folder = EXTRACT_FOLDERS[current_platform]
-    
-    # Check if already exists
-    blender_dir = os.path.join(node_dir, extract_folder)
-    executable_path = os.path.join(blender_dir, BLENDER_EXECUTABLES[current_platform])
-    
+    url = os.environ.get("BLENDER_DOWNLOAD_URL", DOWNLOAD_URLS[current_platform])
+    archive_folder = ARCHIVE_FOLDERS[current_platform]
+    executable_path = os.path.join(CACHE_DIR, archive_folder, BLENDER_EXECUTABLES[current_platform])
+
     if os.path.exists(executable_path):
         print(f"Blender already exists at: {executable_path}")
         return executable_path
-    
+
     print(f"Downloading Blender {BLENDER_VERSION} for {current_platform}...")
-    
-    # Download
-    filename = url.split("/")[-1]
-    download_path = os.path.join(node_dir, filename)
-    
+    lock = _cache_lock(CACHE_DIR, archive_folder)
     try:
-        urllib.request.urlretrieve(url, download_path)
-        print(f"Downloaded: {filename}")
-        
-        # Extract
-        print(f"Extracting {filename}...")
-        if current_platform == "Windows":
-            with zipfile.ZipFile(download_path, 'r') as zip_ref:
-                zip_ref.extractall(node_dir)
-        else:  # Linux
-            # Extract tar.xz and rename to shorter "blender" folder (following Linux guide)
-            temp_extract_name = f"blender-{BLENDER_VERSION}-linux-x64"
-            with tarfile.open(download_path, 'r:xz') as tar_ref:
-                tar_ref.extractall(node_dir)
-            
-            # Rename extracted folder to shorter "blender" name for convenience
-            temp_path = os.path.join(node_dir, temp_extract_name)
-            final_path = os.path.join(node_dir, "blender")
-            if os.path.exists(temp_path):
-                if os.path.exists(final_path):
-                    import shutil
-                    shutil.rmtree(final_path)  # Remove old version
-                os.rename(temp_path, final_path)
-                print(f"Renamed to shorter folder name: blender")
-        
-        # Clean up download file
-        os.remove(download_path)
-        print(f"Cleaned up: {filename}")
-        
-        # Set executable permissions on Linux (following Linux guide)
-        if current_platform == "Linux":
-            os.chmod(executable_path, 0o755)
-            print(f"Made executable: {executable_path}")
-            
-            # Also set permissions on any other binaries in the blender folder
-            blender_bin_dir = os.path.dirname(executable_path)
-            for item in os.listdir(blender_bin_dir):
-                item_path = os.path.join(blender_bin_dir, item)
-                if os.path.isfile(item_path) and not item.endswith(('.py', '.txt', '.md')):
-                    try:
-                        os.chmod(item_path, 0o755)
-                    except:
-                        pass  # Ignore permission errors on non-executable files
-        
-        print(f"Blender {BLENDER_VERSION} ready at: {executable_path}")
-        return executable_path
-        
+        # Another install may have finished while we waited for the lock
+        if not os.path.exists(executable_path):
+            checksum_url = os.environ.get("BLENDER_CHECKSUM_URL", CHECKSUM_URL)
+            download_and_install(url, CACHE_DIR, archive_folder, checksum_url=checksum_url)
     except Exception as e:
         print(f"Error downloading Blender: {e}")
-        if os.path.exists(download_path):
-            os.remove(download_path)
         raise
+    finally:
+        lock.close()
+
+    # Set executable permissions on Linux (following Linux guide)
+    if current_platform == "Linux" and not os.access(executable_path, os.X_OK):
+        os.chmod(executable_path, 0o755)
+        print(f"Made executable: {executable_path}")
+
+    print(f"Blender {BLENDER_VERSION} ready at: {executable_path}")
+    return executable_path
 
 def get_blender_path(node_dir):
     """Get Blender executable path, download if needed"""
     current_platform = get_platform()
     extract_folder = EXTRACT_FOLDERS[current_platform]
     executable = BLENDER_EXECUTABLES[current_platform]
-    
+
+    # Installs made by earlier versions of this node live inside the node folder
     blender_path = os.path.join(node_dir, extract_folder, executable)
-    
     if os.path.exists(blender_path):
         return blender_path
+
+    shared_path = os.path.join(CACHE_DIR, ARCHIVE_FOLDERS[current_platform], executable)
+    if os.path.exists(shared_path):
+        return shared_path
     else:
-        return download_blender(node_dir)
\ No newline at end of file
+        return download_blender(node_dir)
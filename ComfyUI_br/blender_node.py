@@ -1,18 +1,33 @@
 import os
+import json
 import subprocess
 import torch
 import numpy as np
 from PIL import Image
-import tempfile
 import platform
+import time
+from .blender_worker import record_latency
+from .render_pool import get_pool, available_cpus
+from .scene_prep import resolve_scene, scene_footprint
+from . import texture_prep
+from .blender_process import RenderProgress, run_blender
+from .render_cache import render_cache, render_key, plate_key, settings_key
+from .pixel_transport import TRANSPORTS, OUTPUT_DEPTHS, write_raw_texture, read_output, linear_to_srgb
+from .scratch_space import scratch_space
+
+# Presets defined in blender_render_script.QUALITY_TIERS; "custom" uses only the inputs below
+QUALITY_TIERS = ["custom", "preview", "standard", "final"]
+
+# Job description version understood by blender_render_script.normalize_job
+JOB_VERSION = 1
 
 def get_default_blender_path():
     """Get Blender executable path using relative paths (following Linux guide approach)"""
     node_dir = os.path.dirname(os.path.abspath(__file__))
     
     try:
-        from .blender_downloader import get_blender_path
-        return get_blender_path(node_dir)
+        from .blender_setup import wait_for_blender
+        return wait_for_blender()  # Blocks only if background setup hasn't finished yet
     except Exception as e:
         print(f"Auto-downloader failed: {e}")
     
@@ -39,6 +54,126 @@ def get_default_blender_path():
         else:
             raise FileNotFoundError(f"Blender not found at: {blender_path}. Please check auto-download or manually extract to 'blender' folder.")
 
+def composite_region(plate, region, region_info):
+    """Paste a border-cropped region render into the full-frame background plate"""
+    height, width = plate.shape[:2]
+    region_height, region_width = region.shape[:2]
+    border = region_info.get("border") if region_info else None
+    if not border or (region_height, region_width) == (height, width):
+        return region  # Full frame already
+    if list(region_info.get("resolution", [])) != [width, height]:
+        print(f"Warning: Background plate is {width}x{height} but the region render expects "
+              f"{region_info.get('resolution')}; returning the region render uncomposited")
+        return region
+
+    # Blender's border origin is bottom-left; numpy rows start at the top
+    x0 = min(max(0, int(border[0] * width)), width - region_width)
+    y0 = min(max(0, height - int(border[1] * height) - region_height), height - region_height)
+    composite = plate.copy()
+    composite[y0:y0 + region_height, x0:x0 + region_width] = region
+    return composite
+
+def parse_cameras(cameras):
+    """Camera names / fnmatch patterns from the comma-separated node input (empty = scene default)"""
+    return [name.strip() for name in (cameras or "").split(",") if name.strip()]
+
+def parse_stages(progressive_stages):
+    """Preview sample counts from the comma-separated node input (empty = progressive mode off)"""
+    try:
+        return [int(n) for n in (progressive_stages or "").split(",") if n.strip()]
+    except ValueError:
+        raise ValueError(f"progressive_stages must be comma-separated sample counts, got {progressive_stages!r}")
+
+def view_output_path(output_path, camera_index, camera_count):
+    """Mirror of blender_render_script.view_output_path: where one camera view of a frame is written"""
+    if camera_count == 1:
+        return output_path
+    root, ext = os.path.splitext(output_path)
+    return f"{root}_cam{camera_index}{ext}"
+
+def decode_output(path):
+    """Decode one render output; EXR is converted from scene-linear to sRGB and kept as float16"""
+    arr = read_output(path)
+    if arr.dtype == np.float32:
+        arr = linear_to_srgb(arr).astype(np.float16)
+    return arr
+
+def image_tensor(frames):
+    """[B,H,W,3] uint8 / uint16 / float frames -> ComfyUI float32 IMAGE tensor"""
+    if frames.dtype == np.uint8:
+        return torch.from_numpy(frames.astype(np.float32) / 255.0)
+    if frames.dtype == np.uint16:
+        return torch.from_numpy(frames.astype(np.float32) / 65535.0)
+    return torch.from_numpy(frames.astype(np.float32))
+
+def read_report(path):
+    """Structured report written by the render script (None if it is missing or unreadable)"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def format_report(report):
+    """One-line log summary of a render report"""
+    device = (report.get("device") or {}).get("backend", "unknown device")
+    timings = report.get("timings", {})
+    phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items() if name != "total")
+    render_phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in report.get("render_phases", {}).items())
+    if render_phases:
+        phases += f" [{render_phases}]"
+    peak = (report.get("peak_memory_mb") or {}).get("render") or (report.get("peak_memory_mb") or {}).get("process")
+    peak = f"{peak:.0f} MB" if peak else "unknown"
+    return (f"Render report: {len(report.get('frames', []))} frame(s) on {device}, {report.get('samples')} samples, "
+            f"{timings.get('total', 0.0):.2f}s ({phases}), peak memory {peak}, "
+            f"{len(report.get('warnings', []))} warning(s)")
+
+def split_job(job, parts):
+    """Up to `parts` contiguous sub-jobs of a texture batch (one per pool worker), each with its own report"""
+    count = len(job["diffuse_paths"])
+    parts = max(1, min(parts, count))
+    if parts == 1:
+        return [job]
+    root, ext = os.path.splitext(job["report_path"])
+    sub_jobs = []
+    start = 0
+    for part in range(parts):
+        end = start + count // parts + (1 if part < count % parts else 0)
+        sub_job = dict(job, diffuse_paths=job["diffuse_paths"][start:end], output_paths=job["output_paths"][start:end],
+                       report_path=f"{root}.part{part}{ext}")
+        if job.get("regions"):
+            sub_job["regions"] = job["regions"][start:end]
+        sub_jobs.append(sub_job)
+        start = end
+    return sub_jobs
+
+def merge_reports(sub_jobs, reports):
+    """One report for a batch rendered as parallel sub-jobs; phase timings are the slowest part's (they overlap)"""
+    merged = None
+    offset = 0
+    for sub_job, report in zip(sub_jobs, reports):
+        if report is not None:
+            if merged is None:
+                merged = dict(report, ok=True, error=None, budget_cut=False, frames=[], warnings=[], timings={},
+                              render_phases={}, peak_memory_mb={"render": None, "process": None})
+            merged["ok"] = merged["ok"] and report.get("ok", False)
+            merged["error"] = merged["error"] or report.get("error")
+            merged["budget_cut"] = merged["budget_cut"] or report.get("budget_cut", False)
+            merged["frames"] += [dict(frame, index=frame.get("index", 0) + offset) for frame in report.get("frames", [])]
+            merged["warnings"] += [w for w in report.get("warnings", []) if w not in merged["warnings"]]
+            for name, seconds in report.get("timings", {}).items():
+                merged["timings"][name] = max(merged["timings"].get(name, 0.0), seconds)
+            for name, seconds in report.get("render_phases", {}).items():
+                merged["render_phases"][name] = round(merged["render_phases"].get(name, 0.0) + seconds, 4)
+            for name, peak in (report.get("peak_memory_mb") or {}).items():
+                if peak is not None:
+                    merged["peak_memory_mb"][name] = max(merged["peak_memory_mb"].get(name) or 0.0, peak)
+        offset += len(sub_job["diffuse_paths"])
+    if merged is not None:
+        merged["ok"] = merged["ok"] and all(report is not None for report in reports)
+        merged["parts"] = len(sub_jobs)
+    return merged
+
 class BlenderRenderNode:
     @classmethod
     def INPUT_TYPES(cls):
@@ -58,114 +193,347 @@ class BlenderRenderNode:
                 "samples": ("INT", {"default": 128, "min": 1, "max": 4096, "step": 1}),
                 "use_denoising": ("BOOLEAN", {"default": True}),
                 "adaptive_sampling": ("BOOLEAN", {"default": True}),
+            },
+            "optional": {
+                # Resolution / adaptive sampling / time limit / bounce / denoiser preset
+                "quality": (QUALITY_TIERS, {"default": "custom"}),
+                # With use_gpu, render on GPUs only instead of GPU + CPU hybrid
+                "exclude_cpu": ("BOOLEAN", {"default": False}),
+                # Render threads on CPU (0 = all cores)
+                "cpu_threads": ("INT", {"default": 0, "min": 0, "max": 1024, "step": 1}),
+                # Keep background Blender processes with the scene loaded between renders (pool size: BLENDER_POOL_SIZE)
+                "persistent_worker": ("BOOLEAN", {"default": False}),
+                # "shared_memory" hands raw pixels over /dev/shm instead of PNG files
+                "transport": (TRANSPORTS, {"default": "png"}),
+                # Render output precision: 8-bit PNG/BMP, 16-bit TIFF, or half-float EXR (no 8-bit banding)
+                # (EXR is decoded with the plain sRGB curve and clipped to 0-1: it matches only the Standard view transform)
+                "output_depth": (list(OUTPUT_DEPTHS), {"default": "8bit"}),
+                # Shrink textures to the curtains' on-screen texel density (measured once per scene) before handoff
+                "downsample_texture": ("BOOLEAN", {"default": False}),
+                # Render only the curtains' screen region and composite it over a cached full-frame plate
+                "region_render": ("BOOLEAN", {"default": False}),
+                # Margin around the projected curtain bounds, as a fraction of the frame
+                "region_margin": ("FLOAT", {"default": 0.05, "min": 0.0, "max": 0.5, "step": 0.01}),
+                # Build a purged, pre-patched copy of the scene on first use (a valid copy is always used)
+                "prepare_scene": ("BOOLEAN", {"default": False}),
+                # Reuse earlier results for identical texture, scene, script and settings
+                "use_cache": ("BOOLEAN", {"default": True}),
+                # Comma-separated camera names or patterns ("Camera*"), each rendered per texture (empty = Camera.006)
+                "cameras": ("STRING", {"default": ""}),
+                # Progressive mode: render at these sample counts first ("8,32"), previewing each stage (empty = off)
+                "progressive_stages": ("STRING", {"default": ""}),
+                # Accept the best finished stage once the next one would overrun this many seconds (0 = no budget)
+                "time_budget_seconds": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 86400.0, "step": 0.5}),
+                # Wall-clock limit per render; the Blender process tree is killed when exceeded (0 = no limit)
+                "timeout_seconds": ("INT", {"default": int(os.environ.get("BLENDER_RENDER_TIMEOUT", "0")), "min": 0, "max": 86400, "step": 1}),
             }
         }
 
-    RETURN_TYPES = ("IMAGE",)
+    # "report" is the render script's JSON report (timings, device, samples, patched materials, warnings);
+    # "views" lists the texture and camera index of every image in the batch
+    RETURN_TYPES = ("IMAGE", "STRING", "STRING")
+    RETURN_NAMES = ("image", "report", "views")
     FUNCTION = "render"
     CATEGORY = "External/Blender"
     OUTPUT_NODE = False
     
     @classmethod  
-    def IS_CHANGED(cls, **kwargs):
+    def IS_CHANGED(cls, blend_file, use_cache=True, region_render=False, region_margin=0.05, time_budget_seconds=0.0, **kwargs):
+        # ComfyUI passes only widget values here (linked inputs like the texture are missing) and re-runs
+        # the node itself when upstream outputs change, so this keys on the settings, scene and script
+        if float(time_budget_seconds) > 0:
+            return float("nan")  # A time budget may cut samples, so the result depends on how fast Blender ran
+        try:
+            if use_cache:
+                node_dir = os.path.dirname(os.path.abspath(__file__))
+                params = cls._render_params(**kwargs)
+                if region_render:
+                    params["region_margin"] = float(region_margin)
+                return settings_key(os.path.join(node_dir, blend_file),
+                                    os.path.join(node_dir, "blender_render_script.py"), params)
+        except Exception as e:
+            print(f"Render cache: could not hash settings: {e}")
         import time
         return str(time.time())
 
-    def render(self, blend_file, diffuse_texture, width_ratio=1.0, height_ratio=1.0, use_gpu=True, samples=128, use_denoising=True, adaptive_sampling=True):
+    @classmethod
+    def _render_params(cls, width_ratio=1.0, height_ratio=1.0, use_gpu=True, samples=128, use_denoising=True, adaptive_sampling=True, quality="custom", cameras="", output_depth="8bit", downsample_texture=False, **kwargs):
+        """Settings that change the rendered pixels (everything but the texture and region options)"""
+        params = {
+            "width_ratio": float(width_ratio),
+            "height_ratio": float(height_ratio),
+            "use_gpu": bool(use_gpu),
+            "samples": int(samples),
+            "use_denoising": bool(use_denoising),
+            "adaptive_sampling": bool(adaptive_sampling),
+            "quality": quality,
+        }
+        if parse_cameras(cameras):
+            params["cameras"] = parse_cameras(cameras)
+        if output_depth != "8bit":
+            params["output_depth"] = output_depth
+        if downsample_texture:
+            params["downsample_texture"] = True
+        return params
+
+    @classmethod
+    def _cache_key(cls, blend_file, diffuse_texture, render_params, region_render=False, region_margin=0.05):
+        """Render cache key from already-built `_render_params` output"""
+        node_dir = os.path.dirname(os.path.abspath(__file__))
+        params = dict(render_params)
+        if region_render:
+            params["region_margin"] = float(region_margin)
+        return render_key(diffuse_texture, os.path.join(node_dir, blend_file),
+                          os.path.join(node_dir, "blender_render_script.py"), params)
+
+    def render(self, blend_file, diffuse_texture, width_ratio=1.0, height_ratio=1.0, use_gpu=True, samples=128, use_denoising=True, adaptive_sampling=True, quality="custom", exclude_cpu=False, cpu_threads=0, persistent_worker=False, transport="png", output_depth="8bit", downsample_texture=False, region_render=False, region_margin=0.05, prepare_scene=False, use_cache=True, cameras="", progressive_stages="", time_budget_seconds=0.0, timeout_seconds=0):
         node_dir = os.path.dirname(os.path.abspath(__file__))
         script_path = os.path.join(node_dir, "blender_render_script.py")
 
+        blend_file_path = os.path.join(node_dir, blend_file)
+        if not os.path.exists(blend_file_path):
+            raise FileNotFoundError(f"Blender scene file not found at: {blend_file_path}")
+
+        render_params = self._render_params(width_ratio, height_ratio, use_gpu, samples,
+                                            use_denoising, adaptive_sampling, quality, cameras, output_depth,
+                                            downsample_texture)
+        camera_specs = parse_cameras(cameras)
+        cache_key = None
+        if use_cache:
+            cache_key = self._cache_key(blend_file, diffuse_texture, render_params, region_render, region_margin)
+            cached = render_cache.get(cache_key)
+            print(render_cache.summary())
+            if cached is not None:
+                print(f"Render cache hit: {cache_key[:16]}")
+                report = {"ok": True, "cached": True, "cache_key": cache_key}
+                textures = diffuse_texture.shape[0] if diffuse_texture.dim() == 4 else 1
+                camera_count = max(1, cached.shape[0] // textures)
+                # Patterns are resolved inside Blender, so only plain camera names are known here
+                names = camera_specs if len(camera_specs) == camera_count and not any(
+                    char in "".join(camera_specs) for char in "*?[") else [None] * camera_count
+                views = [{"texture": i // camera_count, "camera_index": i % camera_count, "camera": names[i % camera_count]}
+                         for i in range(cached.shape[0])]
+                return (image_tensor(cached), json.dumps(report), json.dumps(views))
+
         blender_path = get_default_blender_path()
         if not blender_path or not os.path.exists(blender_path):
             raise FileNotFoundError(f"Blender executable not found. Expected at: {blender_path}")
 
-        blend_file_path = os.path.join(node_dir, blend_file)
-        if not os.path.exists(blend_file_path):
-            raise FileNotFoundError(f"Blender scene file not found at: {blend_file_path}")
-        
-        import time
-        timestamp = int(time.time())
-        output_path = os.path.join(node_dir, f"render_output_{timestamp}.png")
-        
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        # Texel density of the curtains per camera, measured on the source scene and cached beside prepared scenes
+        footprint = None
+        if downsample_texture:
+            try:
+                footprint = scene_footprint(blender_path, blend_file_path, script_path, cwd=node_dir,
+                                            timeout=timeout_seconds or None)
+            except Exception as e:
+                print(f"Warning: Could not measure texel footprint, textures are passed unchanged: {e}")
 
-        temp_dir = tempfile.mkdtemp(prefix="comfyui_blender_textures_")
+        # Cache keys stay on the source file; rendering uses the prepared copy when it matches
+        blend_file_path = resolve_scene(blender_path, blend_file_path, script_path, prepare=prepare_scene,
+                                        cwd=node_dir, timeout=timeout_seconds or None)
+
+        # Textures, renders and the report of this job live in their own scratch directory
+        shared_memory = transport == "shared_memory"
+        output_extension = OUTPUT_DEPTHS[output_depth] or (".bmp" if shared_memory else ".png")
+        temp_dir = scratch_space.allocate()
+        diffuse_paths = []
+        output_paths = []
+        texture_scales = []
         
         try:
-            # Save texture input
-            if diffuse_texture.dim() == 4:
-                diffuse_tensor = diffuse_texture.squeeze(0)
-            else:
-                diffuse_tensor = diffuse_texture
-            
-            tex_array = (diffuse_tensor.cpu().numpy() * 255).astype(np.uint8)
-            tex_image = Image.fromarray(tex_array)
-            
-            diffuse_path = os.path.join(temp_dir, "input_diffuse.png")
-            tex_image.save(diffuse_path, optimize=False, compress_level=0)
-            print(f"Saved diffuse texture to: {diffuse_path}")
-
-            cmd = [
-                blender_path,
-                "-b",
-                blend_file_path,
-                "-P", script_path,
-                "--",
-                diffuse_path,
-                output_path,
-                str(width_ratio),
-                str(height_ratio),
-                str(use_gpu).lower(),
-                str(samples),
-                str(use_denoising).lower(),
-                str(adaptive_sampling).lower()
-            ]
-            
-            print(f"Running Blender render with GPU: {use_gpu}, Samples: {samples}")
-            print("Command:", " ".join([f'"{arg}"' if ' ' in arg else arg for arg in cmd]))
-            
+            # Save every texture of the batch; Blender renders them all in one session
+            if diffuse_texture.dim() == 3:
+                diffuse_texture = diffuse_texture.unsqueeze(0)
+
+            for index, diffuse_tensor in enumerate(diffuse_texture):
+                tex_array = (diffuse_tensor.cpu().numpy() * 255).astype(np.uint8)
+                if footprint:
+                    scale = texture_prep.texture_scale(footprint, (tex_array.shape[1], tex_array.shape[0]),
+                                                      width_ratio, height_ratio, quality, camera_specs)
+                    if scale < 1.0:
+                        original = f"{tex_array.shape[1]}x{tex_array.shape[0]}"
+                        tex_array = texture_prep.downsample_texture(tex_array, scale)
+                        print(f"Downsampled texture {index}: {original} -> {tex_array.shape[1]}x{tex_array.shape[0]}")
+                    texture_scales.append(round(scale, 4))
+
+                if shared_memory:
+                    diffuse_path = write_raw_texture(tex_array, os.path.join(temp_dir, f"input_diffuse_{index}.rgba"))
+                    output_path = os.path.join(temp_dir, f"render_output_{index}{output_extension}")
+                else:
+                    tex_image = Image.fromarray(tex_array)
+                    diffuse_path = os.path.join(temp_dir, f"input_diffuse_{index}.png")
+                    tex_image.save(diffuse_path, optimize=False, compress_level=0)
+                    output_path = os.path.join(temp_dir, f"render_output_{index}{output_extension}")
+                diffuse_paths.append(diffuse_path)
+                output_paths.append(output_path)
+            print(f"Saved {len(diffuse_paths)} diffuse texture(s) to: {temp_dir} ({transport})")
+
+            job = {
+                "version": JOB_VERSION,
+                "diffuse_paths": diffuse_paths,
+                "output_paths": output_paths,
+                "width_ratio": float(width_ratio),
+                "height_ratio": float(height_ratio),
+                "use_gpu": bool(use_gpu),
+                "samples": int(samples),
+                "use_denoising": bool(use_denoising),
+                "adaptive_sampling": bool(adaptive_sampling),
+                "quality": quality,
+                "exclude_cpu": bool(exclude_cpu),
+                "threads": int(cpu_threads),
+                "report_path": os.path.join(temp_dir, "render_report.json"),
+                "cameras": camera_specs or None,
+                "progressive_stages": parse_stages(progressive_stages) or None,
+                "time_budget": float(time_budget_seconds),
+            }
+
+            # Region frames need a full-frame plate; the first frame renders it when none is cached
+            plate = None
+            if region_render:
+                background_key = plate_key(os.path.join(node_dir, blend_file), script_path, render_params)
+                plate = render_cache.get(background_key)
+                job["regions"] = ["curtains"] * len(diffuse_paths)
+                if plate is None:
+                    job["regions"][0] = "full"
+                job["region_margin"] = float(region_margin)
+
+            print(f"Running Blender render with GPU: {use_gpu}, Samples: {samples}, Quality: {quality}, Batch: {len(diffuse_paths)}")
+            timeout = timeout_seconds or None
+            progress = RenderProgress(len(diffuse_paths), on_stage=lambda stage: self._show_stage(stage, progress))
+            start = time.perf_counter()
             try:
-                result = subprocess.run(cmd, check=True, capture_output=True, text=True, cwd=node_dir)
-                print("Blender render completed successfully!")
-                if result.stdout:
-                    print("Blender output:", result.stdout[-500:])
-                if result.stderr:
-                    print("Blender warnings:", result.stderr[-500:])
-            except PermissionError as e:
-                if platform.system() == "Windows":
-                    error_msg = f"Permission denied when trying to execute Blender. Try running: Unblock-File '{blender_path}' in PowerShell as administrator."
-                else:  # Linux
-                    error_msg = f"Permission denied when trying to execute Blender. Try running: chmod +x '{blender_path}'"
-                print(error_msg)
-                raise PermissionError(error_msg) from e
-            except subprocess.CalledProcessError as e:
-                print(f"Blender render failed with code {e.returncode}")
-                print("Error output:", e.stderr)
-                # Dump internal blender error if possible
-                pass
+                if persistent_worker:
+                    pool = get_pool(blender_path, blend_file_path, script_path, cwd=node_dir)
+                    self._render_warm(pool, job, timeout, progress)
+                    print(record_latency("warm", time.perf_counter() - start))
+                    print(pool.summary())
+                else:
+                    self._render_cold(blender_path, blend_file_path, script_path, node_dir, job, timeout, progress)
+                    print(record_latency("cold", time.perf_counter() - start))
+            except Exception:
+                report = read_report(job["report_path"])
+                if report:
+                    print(format_report(report))
+                    for warning in report.get("warnings", []):
+                        print(f"Blender warning: {warning}")
                 raise
 
-            if not os.path.exists(output_path):
-                raise FileNotFoundError(f"Render output not found: {output_path}")
-            
-            img = Image.open(output_path).convert("RGB")
-            arr = np.array(img).astype(np.float32) / 255.0
-            tensor = torch.from_numpy(arr)[None,]
-            
-            try:
-                os.remove(output_path)
-            except Exception as e:
-                print(f"Warning: Could not clean up output file: {e}")
-            
-            return (tensor,)
+            report = read_report(job["report_path"]) or {"ok": True, "warnings": ["Render script wrote no report"]}
+            print(format_report(report))
+            for warning in report.get("warnings", []):
+                print(f"Blender warning: {warning}")
+
+            if progress.device:
+                device_names = ", ".join(d["name"] for d in progress.device["devices"])
+                print(f"Rendered on {progress.device['backend']}: {device_names}")
+
+            # Texture-major: every camera view of texture 0, then of texture 1, ...
+            camera_names = report.get("cameras") or [None]
+            views = []
+            frames = []
+            decode_start = time.perf_counter()
+            for index, output_path in enumerate(output_paths):
+                for camera_index, camera_name in enumerate(camera_names):
+                    view_path = view_output_path(output_path, camera_index, len(camera_names))
+                    if not os.path.exists(view_path):
+                        raise FileNotFoundError(f"Render output not found: {view_path}")
+
+                    frames.append(decode_output(view_path))
+                    views.append({"texture": index, "camera_index": camera_index, "camera": camera_name})
+            decode_seconds = time.perf_counter() - decode_start
+            print(f"Decoded {len(frames)} frame(s) ({output_depth}, {output_extension}) in {decode_seconds * 1000:.1f} ms")
+
+            if region_render:
+                if plate is None:
+                    plate = np.stack(frames[:len(camera_names)], axis=0)
+                    # Later region renders composite over the plate; an under-sampled one would stick
+                    if not report.get("budget_cut"):
+                        render_cache.put(background_key, plate)
+                frames = [composite_region(plate[view["camera_index"]], arr,
+                                           progress.regions.get(view["camera_index"], progress.region))
+                          for view, arr in zip(views, frames)]
+
+            frames = np.stack(frames, axis=0)
+            # A budget-cut render has fewer samples than its cache key promises
+            if cache_key is not None and not report.get("budget_cut"):
+                render_cache.put(cache_key, frames)
+
+            report["cached"] = False
+            report["output_depth"] = output_depth
+            if footprint:
+                report["texture_scales"] = texture_scales
+            report["decode_seconds"] = round(decode_seconds, 4)
+            report["wall_time"] = round(time.perf_counter() - start, 4)
+            return (image_tensor(frames), json.dumps(report), json.dumps(views))
             
         finally:
-            import shutil
             try:
-                shutil.rmtree(temp_dir)
+                scratch_space.release(temp_dir)
             except Exception as e:
                 print(f"Warning: Could not clean up temp dir {temp_dir}: {e}")
 
+    def _show_stage(self, stage, progress):
+        """Preview a finished progressive stage while later stages render"""
+        print(f"Progressive stage {stage['stage'] + 1}/{stage['stages']} of frame {stage['frame']}: "
+              f"{stage['samples']} samples in {stage['seconds']:.2f}s")
+        preview = image_tensor(decode_output(stage["path"])[None])[0].numpy()
+        progress.preview(Image.fromarray((preview * 255).astype(np.uint8)))
+
+    def _render_warm(self, pool, job, timeout=None, progress=None):
+        """Render on the pool, split into one contiguous sub-job per worker when the batch has several textures"""
+        sub_jobs = split_job(job, pool.size)
+        if len(sub_jobs) == 1:
+            pool.render(job, timeout=timeout, progress=progress)
+            return
+        print(f"Splitting {len(job['diffuse_paths'])} textures across {len(sub_jobs)} warm workers")
+        try:
+            progresses = [progress.part(len(sub_job["diffuse_paths"])) for sub_job in sub_jobs] if progress else None
+            pool.render_all(sub_jobs, timeout=timeout, progresses=progresses)
+        finally:
+            report = merge_reports(sub_jobs, [read_report(sub_job["report_path"]) for sub_job in sub_jobs])
+            if report is not None:
+                with open(job["report_path"], "w") as f:
+                    json.dump(report, f, indent=2)
+
+    def _render_cold(self, blender_path, blend_file_path, script_path, node_dir, job, timeout=None, progress=None):
+        """Render in a fresh Blender process (startup + scene load on every call)"""
+        # Blender would count the host's cores; a container's affinity or CPU quota may allow fewer
+        if not job.get("threads"):
+            job = dict(job, threads=available_cpus())
+        # Settings travel in a versioned job file next to the outputs instead of positional argv
+        job_path = os.path.join(os.path.dirname(job["output_paths"][0]), "job.json")
+        with open(job_path, "w") as f:
+            json.dump(job, f)
+        cmd = [
+            blender_path,
+            "-b",
+            blend_file_path,
+            "-P", script_path,
+            "--",
+            f"--job={job_path}",
+        ]
+
+        print("Command:", " ".join([f'"{arg}"' if ' ' in arg else arg for arg in cmd]))
+
+        try:
+            output = run_blender(cmd, cwd=node_dir, timeout=timeout, progress=progress)
+            print("Blender render completed successfully!")
+            if output:
+                print("Blender output:", output[-500:])
+        except PermissionError as e:
+            if platform.system() == "Windows":
+                error_msg = f"Permission denied when trying to execute Blender. Try running: Unblock-File '{blender_path}' in PowerShell as administrator."
+            else:  # Linux
+                error_msg = f"Permission denied when trying to execute Blender. Try running: chmod +x '{blender_path}'"
+            print(error_msg)
+            raise PermissionError(error_msg) from e
+        except subprocess.CalledProcessError as e:
+            print(f"Blender render failed with code {e.returncode}")
+            print("Error output:", e.output)
+            # Dump internal blender error if possible
+            pass
+            raise
+
 NODE_CLASS_MAPPINGS = {
     "Blender Render Node": BlenderRenderNode
 }
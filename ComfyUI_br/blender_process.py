@@ -0,0 +1,248 @@
+"""
+Streaming Blender subprocess execution: progress parsing, timeouts and process-tree cleanup
+"""
+import os
+import re
+import json
+import signal
+import platform
+import subprocess
+import threading
+import queue
+import time
+from collections import deque
+
+SAMPLE_RE = re.compile(r"Sample (\d+)/(\d+)")
+TILE_RE = re.compile(r"(?:Rendered (\d+)/(\d+) Tiles|Tile (\d+)/(\d+))")
+FRAME_RE = re.compile(r"--- Frame (\d+)/(\d+) ---")
+DEVICE_PREFIX = "@@BLENDER_DEVICE@@ "
+REGION_PREFIX = "@@BLENDER_REGION@@ "
+STAGE_PREFIX = "@@BLENDER_STAGE@@ "
+# Longest side of progressive preview images sent to the ComfyUI UI
+PREVIEW_SIZE = 512
+
+# Progress bar resolution per rendered frame
+PROGRESS_STEPS = 1000
+OUTPUT_TAIL_LINES = 200
+POLL_INTERVAL = 0.1
+
+
+def _comfy_progress_bar(total):
+    try:
+        import comfy.utils
+        return comfy.utils.ProgressBar(total)
+    except Exception:
+        return None
+
+
+def check_interrupted():
+    """Raise ComfyUI's interrupt exception if the user cancelled the prompt"""
+    try:
+        import comfy.model_management
+    except ImportError:
+        return
+    comfy.model_management.throw_exception_if_processing_interrupted()
+
+
+class RenderProgress:
+    """Turns Cycles log lines ("Sample N/M", tiles, batch frames) into ComfyUI progress updates.
+
+    Also keeps the structured device and region reports the render script prints
+    (`regions` maps camera index -> region report for multi-camera jobs).
+    `on_stage` is called with each finished progressive stage report. A batch
+    split across pool workers gets one `part()` per sub-job; parts parse their
+    own worker's lines and roll up into this progress bar.
+    """
+
+    def __init__(self, frames=1, on_stage=None, parent=None):
+        self.frames = max(1, frames)
+        self.frame = 0
+        self.tile = (0, 1)
+        self.sample = (0, 1)
+        self.value = 0
+        self.total = self.frames * PROGRESS_STEPS
+        self.parent = parent
+        self._pbar = _comfy_progress_bar(self.total) if parent is None else None
+        self._parts = []
+        self._lock = threading.Lock()
+        self.device = None
+        self.region = None
+        self.regions = {}
+        self.stages = []
+        self.on_stage = on_stage
+
+    def part(self, frames):
+        """Progress of one sub-job of a split batch"""
+        part = RenderProgress(frames, on_stage=self.on_stage, parent=self)
+        with self._lock:
+            self._parts.append(part)
+        return part
+
+    def feed(self, line):
+        if line.startswith(STAGE_PREFIX):
+            try:
+                stage = json.loads(line[len(STAGE_PREFIX):])
+            except ValueError:
+                return
+            self.stages.append(stage)
+            if self.on_stage is not None:
+                try:
+                    self.on_stage(stage)
+                except Exception as e:
+                    print(f"Warning: Could not handle progressive stage: {e}")
+            return
+
+        for prefix, attribute in ((DEVICE_PREFIX, "device"), (REGION_PREFIX, "region")):
+            if line.startswith(prefix):
+                try:
+                    setattr(self, attribute, json.loads(line[len(prefix):]))
+                except ValueError:
+                    pass
+                if attribute == "region" and self.region is not None:
+                    self.regions[self.region.get("camera_index", 0)] = self.region
+                if self.parent is not None:
+                    self.parent.feed(line)
+                return
+
+        match = FRAME_RE.search(line)
+        if match:
+            # Multi-camera jobs render more views than the node sent textures
+            if int(match.group(2)) != self.frames:
+                self.frames = max(1, int(match.group(2)))
+                self.total = self.frames * PROGRESS_STEPS
+            self.frame = int(match.group(1)) - 1
+            self.tile = (0, 1)
+            self.sample = (0, 1)
+            self._update(0.0)
+            return
+
+        tile_match = TILE_RE.search(line)
+        sample_match = SAMPLE_RE.search(line)
+        if not tile_match and not sample_match:
+            return
+        if tile_match:
+            done, total = [int(g) for g in tile_match.groups() if g is not None]
+            self.tile = (done, max(1, total))
+        if sample_match:
+            self.sample = (int(sample_match.group(1)), max(1, int(sample_match.group(2))))
+
+        samples_done, samples = self.sample
+        fraction = samples_done / samples
+        tiles_done, tiles = self.tile
+        if tiles > 1:
+            fraction = (min(tiles_done, tiles - 1) + fraction) / tiles
+        self._update(fraction)
+
+    def _update(self, fraction):
+        value = int((self.frame + min(fraction, 1.0)) * PROGRESS_STEPS)
+        if value > self.value:
+            self.value = value
+            if self.parent is not None:
+                self.parent._roll_up()
+            elif self._pbar is not None:
+                self._pbar.update_absolute(value, self.total)
+
+    def _roll_up(self):
+        with self._lock:
+            self.value = sum(part.value for part in self._parts)
+            self.total = max(1, sum(part.total for part in self._parts))
+            if self._pbar is not None:
+                self._pbar.update_absolute(self.value, self.total)
+
+    def preview(self, image):
+        """Show a PIL image as the node's live preview"""
+        if self.parent is not None:
+            self.parent.preview(image)
+        elif self._pbar is not None:
+            self._pbar.update_absolute(self.value, self.total, ("JPEG", image, PREVIEW_SIZE))
+
+    def finish(self):
+        if self.parent is not None:
+            self.value = self.total
+            self.parent._roll_up()
+        elif self._pbar is not None:
+            self._pbar.update_absolute(self.total, self.total)
+
+
+def popen_kwargs():
+    """Start Blender in its own process group so the whole tree can be killed"""
+    if platform.system() == "Windows":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def kill_process_tree(process):
+    if process.poll() is not None:
+        return
+    try:
+        if platform.system() == "Windows":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                           check=False, capture_output=True)
+        else:
+            os.killpg(os.getpgid(process.pid), signal.SIGKILL)
+    except Exception as e:
+        print(f"Warning: Could not kill Blender process tree: {e}")
+        process.kill()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        pass
+
+
+def run_blender(cmd, cwd=None, timeout=None, progress=None):
+    """Run Blender, streaming its output line by line.
+
+    Returns the last OUTPUT_TAIL_LINES lines of output. Raises TimeoutError
+    (after killing the process tree) when `timeout` seconds pass, and
+    subprocess.CalledProcessError on a non-zero exit.
+    """
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+        cwd=cwd,
+        **popen_kwargs()
+    )
+
+    lines = queue.Queue()
+
+    def read_output():
+        for line in process.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    reader = threading.Thread(target=read_output, daemon=True)
+    reader.start()
+
+    tail = deque(maxlen=OUTPUT_TAIL_LINES)
+    deadline = time.monotonic() + timeout if timeout else None
+    try:
+        while True:
+            try:
+                line = lines.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                line = ""
+            if line is None:
+                break
+            if line:
+                tail.append(line)
+                if progress is not None:
+                    progress.feed(line)
+
+            check_interrupted()
+            if deadline is not None and time.monotonic() > deadline:
+                kill_process_tree(process)
+                raise TimeoutError(f"Blender render exceeded the {timeout}s time limit and was killed")
+    except BaseException:
+        kill_process_tree(process)
+        raise
+
+    returncode = process.wait()
+    output = "".join(tail)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, output=output, stderr=output)
+    if progress is not None:
+        progress.finish()
+    return output
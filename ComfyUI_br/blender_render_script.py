@@ -1,84 +1,369 @@
 import bpy
 import os
 import sys
+import re
+import json
+import time
+import struct
+import fnmatch
 
-# Parse command line arguments
-argv = sys.argv
-argv = argv[argv.index("--") + 1:]
-
-if len(argv) < 8:
-    print("Error: Not enough arguments provided")
-    print("Expected: diffuse_path output_path width_ratio height_ratio use_gpu samples use_denoising adaptive_sampling")
-    sys.exit(1)
-
-diffuse_path = argv[0]
-output_path = argv[1]
-width_ratio = float(argv[2])
-height_ratio = float(argv[3])
-use_gpu = argv[4].lower() == 'true'
-samples = int(argv[5])
-use_denoising = argv[6].lower() == 'true'
-adaptive_sampling = argv[7].lower() == 'true'
-
-print(f"=== Blender Render Configuration ===")
-print(f"Diffuse texture: {diffuse_path}")
-print(f"Ratios: W={width_ratio:.2f}, H={height_ratio:.2f}")
-print(f"Output: {output_path}")
+# Marker for machine-readable lines on stdout (Blender prints its own logs there too)
+RESULT_PREFIX = "@@BLENDER_RESULT@@ "
+# Structured report of the render device chosen for a job
+DEVICE_PREFIX = "@@BLENDER_DEVICE@@ "
+# Structured report of the curtain region (render border) used by region frames
+REGION_PREFIX = "@@BLENDER_REGION@@ "
+# A progressive stage finished; its image is ready to preview
+STAGE_PREFIX = "@@BLENDER_STAGE@@ "
+
+# Cycles GPU backends, fastest first; CPU is the fallback when none reports a device
+BACKEND_PRIORITY = ["OPTIX", "CUDA", "HIP", "ONEAPI"]
+
+# Raw texture handoff (see pixel_transport.py): magic, width, height, then top-down RGBA8 rows
+RAW_MAGIC = b"RAW8"
+RAW_HEADER = struct.Struct("<4sII")
+
+# Output format saved in the .blend; uncompressed BMP is only used for the shared memory transport
+DEFAULT_FILE_FORMAT = bpy.context.scene.render.image_settings.file_format
+DEFAULT_COLOR_MODE = bpy.context.scene.render.image_settings.color_mode
+DEFAULT_COLOR_DEPTH = bpy.context.scene.render.image_settings.color_depth
 
 curtain_objects = ["cur_1", "cur_2"]
 
-def apply_diffuse_and_scale(material, diffuse_path, w_ratio, h_ratio):
-    if not material.use_nodes:
-        return False
-    
+# Camera used when a job names none (the scene's active camera if it is missing)
+DEFAULT_CAMERA = "Camera.006"
+
+# Job description format understood by this script (see normalize_job)
+JOB_VERSION = 1
+JOB_DEFAULTS = {
+    "objects": None,            # Objects whose material slots are patched (None = curtain_objects)
+    "width_ratio": 1.0,
+    "height_ratio": 1.0,
+    "object_ratios": {},        # Per-object [width_ratio, height_ratio] overrides
+    "use_gpu": True,
+    "samples": 128,
+    "use_denoising": True,
+    "adaptive_sampling": True,
+    "quality": "custom",
+    "exclude_cpu": False,
+    "threads": 0,
+    "cameras": None,
+    "regions": None,
+    "region_margin": 0.05,
+    "progressive_stages": None,
+    "time_budget": 0.0,
+    "report_path": None,
+}
+
+# Structured report of the current job (written next to the first output by render_job)
+REPORT_VERSION = 1
+report = None
+
+def warn(message):
+    """Print a warning and record it in the current job's report"""
+    print(f"Warning: {message}")
+    if report is not None:
+        report["warnings"].append(message)
+
+# Cycles status lines -> report phase, checked in order
+STATS_PHASES = [
+    ("sample", "sampling"),
+    ("bvh", "bvh"),
+    ("denois", "denoise"),
+    ("kernel", "kernels"),
+    ("compil", "kernels"),
+    ("synchroniz", "sync"),
+    ("updating", "sync"),
+    ("loading", "sync"),
+    ("finished", None),
+]
+PEAK_RE = re.compile(r"Peak[: ]+([\d.]+)M")
+STATS_SAMPLE_RE = re.compile(r"Sample (\d+)/(\d+)")
+
+_frame_stats = {"phase": None, "since": 0.0, "phases": {}, "samples": None, "peak_mb": None}
+
+def begin_frame_stats():
+    _frame_stats.update(phase=None, since=time.perf_counter(), phases={}, samples=None, peak_mb=None)
+
+def on_render_stats(stats):
+    """render_stats handler: time the Cycles phases from the status lines Blender prints in background mode"""
+    now = time.perf_counter()
+    if _frame_stats["phase"]:
+        phases = _frame_stats["phases"]
+        phases[_frame_stats["phase"]] = phases.get(_frame_stats["phase"], 0.0) + now - _frame_stats["since"]
+    _frame_stats["since"] = now
+
+    status = stats.split("|")[-2:] if "|" in stats else [stats]
+    status = " ".join(status).lower()
+    _frame_stats["phase"] = "other"
+    for keyword, phase in STATS_PHASES:
+        if keyword in status:
+            _frame_stats["phase"] = phase
+            break
+
+    peaks = [float(value) for value in PEAK_RE.findall(stats)]
+    if peaks:
+        _frame_stats["peak_mb"] = max(peaks + [_frame_stats["peak_mb"] or 0.0])
+    sample = STATS_SAMPLE_RE.search(stats)
+    if sample:
+        _frame_stats["samples"] = int(sample.group(1))
+
+def end_frame_stats():
+    on_render_stats("finished")
+    return {
+        "phases": {name: round(seconds, 4) for name, seconds in _frame_stats["phases"].items()},
+        "samples": _frame_stats["samples"],
+        "peak_memory_mb": _frame_stats["peak_mb"],
+    }
+
+if on_render_stats not in bpy.app.handlers.render_stats:
+    bpy.app.handlers.render_stats.append(on_render_stats)
+
+def process_peak_memory_mb():
+    """Peak resident memory of this Blender process (None where resource is unavailable)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+def load_scene_manifest():
+    """Sidecar manifest written by --prepare next to a prepared .blend (empty for regular scenes)"""
+    manifest_path = os.path.splitext(bpy.data.filepath)[0] + ".json"
+    if not bpy.data.filepath or not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable scene manifest {manifest_path}: {e}")
+        return {}
+
+SCENE_MANIFEST = load_scene_manifest()
+
+# Performance tiers; "custom" leaves the .blend's settings alone and only applies the node inputs.
+# "max_samples" caps the node's sample count; bounce caps of None keep the scene value.
+QUALITY_TIERS = {
+    "preview": {
+        "resolution_percentage": 25,
+        "max_samples": 16,
+        "adaptive_threshold": 0.1,
+        "adaptive_min_samples": 4,
+        "time_limit": 1.0,
+        "bounces": {"max_bounces": 2, "diffuse_bounces": 1, "glossy_bounces": 1,
+                    "transmission_bounces": 2, "transparent_max_bounces": 4, "volume_bounces": 0},
+        "denoiser": "OPENIMAGEDENOISE",
+        "denoising_prefilter": "NONE",
+    },
+    "standard": {
+        "resolution_percentage": 50,
+        "max_samples": 64,
+        "adaptive_threshold": 0.05,
+        "adaptive_min_samples": 16,
+        "time_limit": 0.0,
+        "bounces": {"max_bounces": 6, "diffuse_bounces": 3, "glossy_bounces": 3,
+                    "transmission_bounces": 6, "transparent_max_bounces": 8, "volume_bounces": 0},
+        "denoiser": "OPENIMAGEDENOISE",
+        "denoising_prefilter": "FAST",
+    },
+    "final": {
+        "resolution_percentage": 100,
+        "max_samples": None,
+        "adaptive_threshold": 0.01,
+        "adaptive_min_samples": 0,
+        "time_limit": 0.0,
+        "bounces": None,
+        "denoiser": "OPENIMAGEDENOISE",
+        "denoising_prefilter": "ACCURATE",
+    },
+}
+
+# Scene settings a job may touch, restored before every job so warm workers match a fresh load
+JOB_SETTINGS = [
+    ("render", "resolution_percentage"),
+    ("render", "use_persistent_data"),
+    ("render", "threads_mode"),
+    ("render", "threads"),
+    ("render", "use_border"),
+    ("render", "use_crop_to_border"),
+    ("render", "border_min_x"),
+    ("render", "border_min_y"),
+    ("render", "border_max_x"),
+    ("render", "border_max_y"),
+    ("cycles", "adaptive_threshold"),
+    ("cycles", "adaptive_min_samples"),
+    ("cycles", "time_limit"),
+    ("cycles", "max_bounces"),
+    ("cycles", "diffuse_bounces"),
+    ("cycles", "glossy_bounces"),
+    ("cycles", "transmission_bounces"),
+    ("cycles", "transparent_max_bounces"),
+    ("cycles", "volume_bounces"),
+    ("cycles", "denoiser"),
+    ("cycles", "denoising_prefilter"),
+]
+
+def snapshot_settings(scene):
+    settings = {}
+    for group, name in JOB_SETTINGS:
+        owner = getattr(scene, group)
+        if hasattr(owner, name):
+            settings[(group, name)] = getattr(owner, name)
+    return settings
+
+def restore_settings(scene, settings):
+    for (group, name), value in settings.items():
+        setattr(getattr(scene, group), name, value)
+
+PRISTINE_SETTINGS = snapshot_settings(bpy.context.scene)
+PRISTINE_CAMERA = bpy.context.scene.camera
+
+def restore_scene(scene):
+    """Undo a job's scene changes (JOB_SETTINGS, render border, active camera)"""
+    restore_settings(scene, PRISTINE_SETTINGS)
+    scene.camera = PRISTINE_CAMERA
+
+def apply_quality_tier(scene, quality, samples):
+    """Apply a QUALITY_TIERS preset and return the effective sample count"""
+    tier = QUALITY_TIERS.get(quality)
+    if tier is None:
+        return samples
+
+    cycles = scene.cycles
+    scene.render.resolution_percentage = tier["resolution_percentage"]
+    if tier["max_samples"]:
+        samples = min(samples, tier["max_samples"])
+    cycles.adaptive_threshold = tier["adaptive_threshold"]
+    cycles.adaptive_min_samples = tier["adaptive_min_samples"]
+    if hasattr(cycles, "time_limit"):
+        cycles.time_limit = tier["time_limit"]
+    for name, value in (tier["bounces"] or {}).items():
+        if hasattr(cycles, name):
+            setattr(cycles, name, value)
+    try:
+        cycles.denoiser = tier["denoiser"]
+        cycles.denoising_prefilter = tier["denoising_prefilter"]
+    except (AttributeError, TypeError) as e:
+        warn(f"Could not set denoiser for {quality} tier: {e}")
+
+    print(f"Quality tier: {quality} ({tier['resolution_percentage']}% resolution, {samples} samples)")
+    return samples
+
+# Images load_texture created since the last release_job_images()
+job_images = []
+
+def load_texture(diffuse_path):
+    """Load a texture file, filling raw RGBA8 buffers straight into image pixels"""
+    if not diffuse_path.endswith(".rgba"):
+        img = bpy.data.images.load(diffuse_path, check_existing=False)
+        job_images.append(img)
+        return img
+
+    import numpy as np
+
+    with open(diffuse_path, "rb") as f:
+        magic, width, height = RAW_HEADER.unpack(f.read(RAW_HEADER.size))
+    if magic != RAW_MAGIC:
+        raise ValueError(f"Not a raw texture: {diffuse_path}")
+
+    raw = np.memmap(diffuse_path, dtype=np.uint8, mode="r", offset=RAW_HEADER.size, shape=(height, width, 4))
+    # Blender stores pixels bottom-up as floats
+    pixels = raw[::-1].astype(np.float32).ravel()
+    pixels /= 255.0
+    del raw
+
+    img = bpy.data.images.new(os.path.basename(diffuse_path), width, height, alpha=True)
+    img.colorspace_settings.name = 'sRGB'
+    img.pixels.foreach_set(pixels)
+    img.update()
+    job_images.append(img)
+    return img
+
+def find_patch_nodes(material):
+    """Locate (principled, image texture, mapping) nodes to patch, creating the texture node if missing"""
     nodes = material.node_tree.nodes
     links = material.node_tree.links
-    
-    # 1. Apply Diffuse Texture
+
     principled = None
     for node in nodes:
         if node.type == 'BSDF_PRINCIPLED':
             principled = node
             break
-            
+
     if not principled:
-        print(f"No Principled BSDF in {material.name}")
-        return False
-        
+        warn(f"No Principled BSDF in {material.name}")
+        return None
+
     # Find Image Texture node connected to Base Color
     tex_node = None
     if "Base Color" in principled.inputs:
         socket = principled.inputs["Base Color"]
         if socket.is_linked:
             tex_node = socket.links[0].from_node
-            
+
     if not tex_node or tex_node.type != 'TEX_IMAGE':
         # Create new if not found
         tex_node = nodes.new('ShaderNodeTexImage')
         tex_node.location = (-300, 300)
         links.new(tex_node.outputs['Color'], principled.inputs['Base Color'])
-        
-    try:
-        # Load image
-        img = bpy.data.images.load(diffuse_path, check_existing=False)
-        tex_node.image = img
-        print(f"Applied diffuse to {material.name}")
-    except Exception as e:
-        print(f"Failed to load diffuse for {material.name}: {e}")
-        
-    # 2. Update Mapping Scale
+
     # Find Mapping node connected to the texture
     mapping_node = None
     if "Vector" in tex_node.inputs and tex_node.inputs["Vector"].is_linked:
         mapping_node = tex_node.inputs["Vector"].links[0].from_node
-    
+
     # If not found directly, look for ANY Mapping node in the tree?
     if not mapping_node or mapping_node.type != 'MAPPING':
         for node in nodes:
             if node.type == 'MAPPING':
                 mapping_node = node
                 break
-    
+
+    return principled, tex_node, mapping_node
+
+def manifest_patch_nodes(material):
+    """Nodes recorded by --prepare for this material, or None if there is no usable manifest entry"""
+    names = SCENE_MANIFEST.get("materials", {}).get(material.name)
+    if not names:
+        return None
+    nodes = material.node_tree.nodes
+    principled = nodes.get(names["principled"])
+    tex_node = nodes.get(names["texture"])
+    mapping_node = nodes.get(names["mapping"]) if names.get("mapping") else None
+    if principled is None or tex_node is None or (names.get("mapping") and mapping_node is None):
+        return None
+    return principled, tex_node, mapping_node
+
+def apply_diffuse_and_scale(material, diffuse_path, w_ratio, h_ratio):
+    """Patch one material; returns its report entry (nodes found, texture applied, new Mapping scale)"""
+    entry = {"material": material.name, "nodes": None, "texture": False, "scale": None}
+    if not material.use_nodes:
+        warn(f"{material.name} does not use nodes, skipping")
+        return entry
+
+    # 1. Find the nodes to patch (pre-recorded in a prepared scene's manifest)
+    found = manifest_patch_nodes(material)
+    entry["nodes"] = "manifest"
+    if not found:
+        found = find_patch_nodes(material)
+        entry["nodes"] = "search" if found else None
+    if not found:
+        return entry
+    principled, tex_node, mapping_node = found
+
+    # 2. Apply Diffuse Texture
+    try:
+        # Load image
+        img = load_texture(diffuse_path)
+        tex_node.image = img
+        entry["texture"] = True
+        print(f"Applied diffuse to {material.name}")
+    except Exception as e:
+        warn(f"Failed to load diffuse for {material.name}: {e}")
+
+    # 3. Update Mapping Scale
     if mapping_node:
         # Update Scale
         # Scale is [x, y, z]
@@ -86,50 +371,798 @@ def apply_diffuse_and_scale(material, diffuse_path, w_ratio, h_ratio):
         new_x = old_scale[0] * w_ratio
         new_y = old_scale[1] * h_ratio
         new_z = old_scale[2] * w_ratio # Uniform Z scaling based on Width?
-        
+
         mapping_node.inputs['Scale'].default_value[0] = new_x
         mapping_node.inputs['Scale'].default_value[1] = new_y
         mapping_node.inputs['Scale'].default_value[2] = new_z
-        
+
+        entry["scale"] = [new_x, new_y, new_z]
         print(f"Updated Mapping Scale in {material.name}: {old_scale} -> ({new_x:.2f}, {new_y:.2f}, {new_z:.2f})")
     else:
-        print(f"No Mapping node found in {material.name}, skipping scale update.")
-        
-    return True
+        warn(f"No Mapping node found in {material.name}, skipping scale update.")
 
-# --- Main Logic ---
-for obj_name in curtain_objects:
-    obj = bpy.data.objects.get(obj_name)
-    if obj:
-        for slot in obj.material_slots:
-            if slot.material:
-                apply_diffuse_and_scale(slot.material, diffuse_path, width_ratio, height_ratio)
-
-# --- Render Setup ---
-camera_obj = bpy.data.objects.get("Camera.006")
-if camera_obj:
-    bpy.context.scene.camera = camera_obj
-
-scene = bpy.context.scene
-scene.render.engine = "CYCLES"
-scene.render.filepath = output_path
-
-# GPU
-if use_gpu:
+    return entry
+
+def curtain_materials(objects=None):
+    """Unique materials used by the curtain objects (or `objects`)"""
+    materials = []
+    for obj_name in objects or curtain_objects:
+        obj = bpy.data.objects.get(obj_name)
+        if obj:
+            for slot in obj.material_slots:
+                if slot.material and slot.material not in materials:
+                    materials.append(slot.material)
+    return materials
+
+def snapshot_materials(objects=None, snapshot=None):
+    """Record the pristine state of the curtain materials so a warm worker can reset between jobs.
+
+    Passing an existing `snapshot` adds materials of further `objects` without touching recorded ones.
+    """
+    snapshot = {} if snapshot is None else snapshot
+    for material in curtain_materials(objects):
+        if not material.use_nodes or material.name in snapshot:
+            continue
+        nodes = material.node_tree.nodes
+        state = {
+            "nodes": set(node.name for node in nodes),
+            "images": {},
+            "scales": {},
+            "base_color_links": [],
+        }
+        for node in nodes:
+            if node.type == 'TEX_IMAGE':
+                state["images"][node.name] = node.image
+            elif node.type == 'MAPPING':
+                state["scales"][node.name] = tuple(node.inputs['Scale'].default_value[:])
+            elif node.type == 'BSDF_PRINCIPLED' and "Base Color" in node.inputs:
+                for link in node.inputs["Base Color"].links:
+                    state["base_color_links"].append((node.name, link.from_node.name, link.from_socket.identifier))
+        snapshot[material.name] = state
+    return snapshot
+
+def restore_materials(snapshot):
+    """Undo everything apply_diffuse_and_scale did, so the next job matches a fresh .blend load"""
+    for material_name, state in snapshot.items():
+        material = bpy.data.materials.get(material_name)
+        if not material or not material.use_nodes:
+            continue
+        nodes = material.node_tree.nodes
+        links = material.node_tree.links
+
+        for node in list(nodes):
+            if node.name not in state["nodes"]:
+                nodes.remove(node)
+
+        for node_name, image in state["images"].items():
+            node = nodes.get(node_name)
+            if node:
+                node.image = image
+
+        for node_name, scale in state["scales"].items():
+            node = nodes.get(node_name)
+            if node:
+                for i, value in enumerate(scale):
+                    node.inputs['Scale'].default_value[i] = value
+
+        for to_name, from_name, from_identifier in state["base_color_links"]:
+            to_node = nodes.get(to_name)
+            from_node = nodes.get(from_name)
+            if not to_node or not from_node:
+                continue
+            socket = to_node.inputs["Base Color"]
+            if socket.is_linked and socket.links[0].from_node == from_node:
+                continue
+            for output in from_node.outputs:
+                if output.identifier == from_identifier:
+                    links.new(output, socket)
+                    break
+
+def release_job_images(pristine_images):
+    """Free the textures load_texture created for previous jobs (raw ones are GENERATED, not type IMAGE)"""
+    while job_images:
+        img = job_images.pop()
+        try:
+            if img.name not in pristine_images:
+                bpy.data.images.remove(img)
+        except ReferenceError:
+            pass  # Already removed
+
+_device_cache = {}
+
+def select_device(scene, use_gpu, exclude_cpu=False, threads=0, gpu_index=None):
+    """Pick the fastest Cycles backend that actually reports devices, falling back to CPU.
+
+    gpu_index pins the render to one GPU of that backend (render pool workers).
+    """
+    key = (use_gpu, exclude_cpu, threads)
+    info = _device_cache.get(key)
     prefs = bpy.context.preferences.addons["cycles"].preferences
-    prefs.compute_device_type = 'CUDA' # Default try
-    # (Simple logic: enable all devices)
-    for device in prefs.devices:
-        device.use = True
-    scene.cycles.device = "GPU"
-else:
-    scene.cycles.device = "CPU"
-
-scene.cycles.samples = samples
-scene.cycles.use_denoising = use_denoising
-
-try:
-    bpy.ops.render.render(write_still=True)
-except Exception as e:
-    print(f"Render failed: {e}")
-    sys.exit(1)
+
+    if info is None:
+        info = {"backend": "CPU", "devices": [], "threads": 0, "fallback": None}
+        if use_gpu:
+            for backend in BACKEND_PRIORITY:
+                try:
+                    prefs.compute_device_type = backend
+                except TypeError:
+                    continue  # Backend not compiled into this Blender build
+                if hasattr(prefs, "refresh_devices"):
+                    prefs.refresh_devices()
+                else:
+                    prefs.get_devices()
+                gpus = [d for d in prefs.devices if d.type == backend]
+                if gpus:
+                    info["backend"] = backend
+                    break
+            else:
+                info["fallback"] = f"No GPU devices found for {', '.join(BACKEND_PRIORITY)}; falling back to CPU"
+        _device_cache[key] = info
+    # Cached with the device info so every job's report carries it, not just the first one's
+    if info["fallback"]:
+        warn(info["fallback"])
+
+    if info["backend"] == "CPU":
+        if use_gpu:
+            try:
+                prefs.compute_device_type = 'NONE'
+            except TypeError:
+                pass
+        scene.cycles.device = "CPU"
+        if threads:
+            scene.render.threads_mode = 'FIXED'
+            scene.render.threads = threads
+        else:
+            # The node sends the CPUs its container may use; Blender's own count is the fallback
+            scene.render.threads_mode = 'AUTO'
+        info["threads"] = scene.render.threads
+        info["devices"] = [{"name": "CPU", "type": "CPU"}]
+    else:
+        prefs.compute_device_type = info["backend"]
+        info["devices"] = []
+        gpus = [d for d in prefs.devices if d.type == info["backend"]]
+        pinned = gpus[gpu_index % len(gpus)] if gpu_index is not None and gpus else None
+        for device in prefs.devices:
+            if device.type == 'CPU':
+                device.use = not exclude_cpu and pinned is None
+            else:
+                device.use = device.type == info["backend"] and (pinned is None or device == pinned)
+            if device.use:
+                info["devices"].append({"name": device.name, "type": device.type})
+        scene.cycles.device = "GPU"
+        if threads:
+            scene.render.threads_mode = 'FIXED'
+            scene.render.threads = threads
+        info["threads"] = threads
+
+    print(DEVICE_PREFIX + json.dumps(info), flush=True)
+    return info
+
+def resolve_cameras(scene, specs):
+    """Camera objects for a job's camera names / fnmatch patterns, in the order given"""
+    if not specs:
+        camera_obj = bpy.data.objects.get(DEFAULT_CAMERA)
+        if camera_obj:
+            return [camera_obj]
+        if scene.camera is None:
+            raise RuntimeError("Scene has no camera")
+        return [scene.camera]
+
+    cameras = []
+    scene_cameras = sorted((obj for obj in bpy.data.objects if obj.type == 'CAMERA'), key=lambda obj: obj.name)
+    for spec in specs:
+        if any(char in spec for char in "*?["):
+            matches = [obj for obj in scene_cameras if fnmatch.fnmatchcase(obj.name, spec)]
+            if not matches:
+                warn(f"No cameras match {spec!r}")
+        else:
+            obj = bpy.data.objects.get(spec)
+            matches = [obj] if obj and obj.type == 'CAMERA' else []
+            if not matches:
+                warn(f"Camera {spec!r} not found in the scene")
+        cameras.extend(obj for obj in matches if obj not in cameras)
+
+    if not cameras:
+        raise RuntimeError(f"No cameras found for {', '.join(specs)}")
+    return cameras
+
+def view_output_path(output_path, camera_index, camera_count):
+    """Output file of one camera view: the frame's own path for single-camera jobs, else a _camN suffix"""
+    if camera_count == 1:
+        return output_path
+    root, ext = os.path.splitext(output_path)
+    return f"{root}_cam{camera_index}{ext}"
+
+def set_output_format(scene, output_path):
+    """Pick the file format from the output extension; only PNG (the .blend's own setting) is compressed"""
+    settings = scene.render.image_settings
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension == ".bmp":
+        settings.file_format = 'BMP'
+        settings.color_mode = 'RGB'
+    elif extension in (".tif", ".tiff"):
+        # 16 bits per channel, view transform applied like the PNG
+        settings.file_format = 'TIFF'
+        settings.color_mode = 'RGB'
+        settings.color_depth = '16'
+        settings.tiff_codec = 'NONE'
+    elif extension == ".exr":
+        # Scene-linear half floats straight from the render buffer
+        settings.file_format = 'OPEN_EXR'
+        settings.color_mode = 'RGB'
+        settings.color_depth = '16'
+        settings.exr_codec = 'NONE'
+    else:
+        settings.file_format = DEFAULT_FILE_FORMAT
+        settings.color_mode = DEFAULT_COLOR_MODE
+        settings.color_depth = DEFAULT_COLOR_DEPTH
+
+def configure_render(scene, job):
+    scene.render.engine = "CYCLES"
+    scene.render.filepath = job["output_paths"][0]
+
+    restore_scene(scene)
+    device = select_device(scene, job["use_gpu"], job.get("exclude_cpu", False), job.get("threads", 0), job.get("gpu_index"))
+    samples = apply_quality_tier(scene, job.get("quality", "custom"), job["samples"])
+
+    scene.cycles.samples = samples
+    scene.cycles.use_denoising = job["use_denoising"]
+    scene.cycles.use_adaptive_sampling = job["adaptive_sampling"]
+    if report is not None:
+        report["device"] = device
+        report["samples"] = samples
+        report["view_transform"] = scene.view_settings.view_transform
+    # EXR skips the view transform; the node's plain sRGB decode only matches it for Standard
+    exr = any(path.lower().endswith(".exr") for path in job["output_paths"])
+    if exr and scene.view_settings.view_transform != "Standard":
+        warn(f"half_float output ignores the '{scene.view_settings.view_transform}' view transform: "
+             f"colours will differ from the 8bit/16bit output (use Standard to match)")
+
+def slot_texture(textures, obj_name, slot_index, material_name):
+    """Texture for one material slot: a single path for every slot, or the most specific of
+    "object/slot_index", "object/material", "object" and "*" in a mapping"""
+    if isinstance(textures, str):
+        return textures
+    for key in (f"{obj_name}/{slot_index}", f"{obj_name}/{material_name}", obj_name, "*"):
+        if key in textures:
+            return textures[key]
+    return None
+
+def apply_texture(textures, job):
+    """Patch every material slot of the job's objects; returns the per-material report entries"""
+    entries = []
+    for obj_name in job["objects"] or curtain_objects:
+        obj = bpy.data.objects.get(obj_name)
+        if not obj:
+            warn(f"Curtain object {obj_name} not found in the scene")
+            continue
+        width_ratio, height_ratio = job["object_ratios"].get(obj_name, (job["width_ratio"], job["height_ratio"]))
+        for slot_index, slot in enumerate(obj.material_slots):
+            if not slot.material:
+                continue
+            diffuse_path = slot_texture(textures, obj_name, slot_index, slot.material.name)
+            if diffuse_path is None:
+                continue
+            entry = apply_diffuse_and_scale(slot.material, diffuse_path, width_ratio, height_ratio)
+            entry["object"] = obj_name
+            entry["slot"] = slot_index
+            entries.append(entry)
+    return entries
+
+def curtain_border(scene, margin, objects=None):
+    """Normalized (min_x, min_y, max_x, max_y) camera-space box around the curtains, or None for full frame"""
+    from bpy_extras.object_utils import world_to_camera_view
+    from mathutils import Vector
+
+    camera = scene.camera
+    if camera is None:
+        return None
+
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    xs, ys = [], []
+    for obj_name in objects or curtain_objects:
+        obj = bpy.data.objects.get(obj_name)
+        if not obj:
+            continue
+        obj_eval = obj.evaluated_get(depsgraph)
+        for corner in obj_eval.bound_box:
+            co = world_to_camera_view(scene, camera, obj_eval.matrix_world @ Vector(corner))
+            if co.z <= 0:
+                return None  # Partly behind the camera: the projection is unreliable
+            xs.append(co.x)
+            ys.append(co.y)
+
+    if not xs:
+        return None
+    border = (max(0.0, min(xs) - margin), max(0.0, min(ys) - margin),
+              min(1.0, max(xs) + margin), min(1.0, max(ys) + margin))
+    if border[0] >= border[2] or border[1] >= border[3]:
+        return None
+    return border
+
+def set_border(scene, border):
+    if border is None:
+        # Full frame: whatever border setup the .blend itself has
+        for (group, name), value in PRISTINE_SETTINGS.items():
+            if group == "render" and (name.startswith("border_") or name in ("use_border", "use_crop_to_border")):
+                setattr(scene.render, name, value)
+        return
+    scene.render.use_border = True
+    scene.render.use_crop_to_border = True
+    scene.render.border_min_x, scene.render.border_min_y, scene.render.border_max_x, scene.render.border_max_y = border
+
+def new_report(job):
+    return {
+        "version": REPORT_VERSION,
+        "ok": False,
+        "error": None,
+        "blender_version": bpy.app.version_string,
+        "scene": bpy.data.filepath,
+        "quality": job.get("quality", "custom"),
+        "device": None,
+        "samples": None,
+        "view_transform": None,
+        "cameras": [],
+        "budget_cut": False,
+        "timings": {},
+        "render_phases": {},
+        "frames": [],
+        "peak_memory_mb": None,
+        "warnings": [],
+    }
+
+def report_path_for(job):
+    """Where the job's report goes: job["report_path"], else next to the first output"""
+    if job.get("report_path"):
+        return job["report_path"]
+    outputs = job.get("output_paths") or []
+    return os.path.splitext(outputs[0])[0] + ".report.json" if outputs else None
+
+def write_report(job):
+    path = report_path_for(job)
+    if path is None:
+        return
+    try:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    except OSError as e:
+        print(f"Could not write render report {path}: {e}")
+
+def add_timing(name, seconds):
+    report["timings"][name] = round(report["timings"].get(name, 0.0) + seconds, 4)
+
+def normalize_job(job):
+    """Validate a job description and fill in JOB_DEFAULTS.
+
+    A job names one texture per frame in "diffuse_paths" (a path, or a mapping
+    of "object/slot", "object/material", "object" or "*" to paths) and one
+    output per frame in "output_paths"; everything else is optional.
+    """
+    version = job.get("version", JOB_VERSION)
+    if not isinstance(version, int) or version > JOB_VERSION:
+        raise ValueError(f"Unsupported job version {version!r} (this script reads up to {JOB_VERSION})")
+    for key in ("diffuse_paths", "output_paths"):
+        if not isinstance(job.get(key), list) or not job[key]:
+            raise ValueError(f"Job needs a non-empty {key} list")
+    if len(job["diffuse_paths"]) != len(job["output_paths"]):
+        raise ValueError("Job needs one output path per entry of diffuse_paths")
+    for key, value in JOB_DEFAULTS.items():
+        if job.get(key) is None:
+            job[key] = value
+    job["version"] = JOB_VERSION
+    return job
+
+def render_job(job, snapshot, pristine_images):
+    """Render a job and write its structured report (also when the render fails)"""
+    global report
+    report = new_report(job)
+    start = time.perf_counter()
+    try:
+        normalize_job(job)
+        # Objects outside the curtains must be reset between jobs too
+        snapshot_materials(job["objects"], snapshot)
+        render_frames(job, snapshot, pristine_images)
+        report["ok"] = True
+    except Exception as e:
+        report["error"] = str(e)
+        raise
+    finally:
+        # A warm worker's next job must see the camera and border the .blend was saved with
+        restore_scene(bpy.context.scene)
+        add_timing("total", time.perf_counter() - start)
+        frame_peaks = [frame["peak_memory_mb"] for frame in report["frames"] if frame.get("peak_memory_mb")]
+        report["peak_memory_mb"] = {
+            "render": max(frame_peaks) if frame_peaks else None,
+            "process": process_peak_memory_mb(),
+        }
+        write_report(job)
+        report = None
+
+def progressive_stages(job, samples):
+    """Ascending sample counts to render a view at; the last one is the job's target"""
+    stages = sorted(set(int(n) for n in job.get("progressive_stages") or [] if 0 < int(n) < samples))
+    return stages + [samples]
+
+def stage_output_path(view_path, stage_index):
+    root, ext = os.path.splitext(view_path)
+    return f"{root}_stage{stage_index}{ext}"
+
+def render_view(scene, view_path, stages, frame, frame_number, deadline):
+    """Render one view at each progressive stage, keeping the last stage that fits the time budget.
+
+    Every stage re-samples from scratch but reuses the synced scene, BVH and
+    kernels (use_persistent_data). Finished stages are announced on stdout
+    so the node can show them as previews.
+    """
+    accepted = None
+    frame["stages"] = []
+    for stage_index, stage_samples in enumerate(stages):
+        stage_path = view_path if len(stages) == 1 else stage_output_path(view_path, stage_index)
+        scene.cycles.samples = stage_samples
+        scene.render.filepath = stage_path
+        stage_start = time.perf_counter()
+        bpy.ops.render.render(write_still=True)
+        seconds = time.perf_counter() - stage_start
+        frame["stages"].append({"samples": stage_samples, "seconds": round(seconds, 4)})
+        if accepted and accepted[1] != view_path and os.path.exists(accepted[1]):
+            os.remove(accepted[1])
+        accepted = (stage_samples, stage_path)
+
+        final = stage_index == len(stages) - 1
+        if not final and deadline is not None:
+            # Estimate the next stage from this one: cost scales with samples
+            estimate = seconds * stages[stage_index + 1] / stage_samples
+            if time.perf_counter() + estimate > deadline:
+                warn(f"Time budget reached: frame {frame_number} accepted at {stage_samples} samples")
+                report["budget_cut"] = True
+                final = True
+        # The kept stage moves to the view path before it is announced, so the node never reads a stale path
+        if final and stage_path != view_path:
+            os.replace(stage_path, view_path)
+            stage_path = view_path
+        if len(stages) > 1:
+            print(STAGE_PREFIX + json.dumps({
+                "frame": frame_number, "stage": stage_index, "stages": len(stages),
+                "samples": stage_samples, "seconds": seconds, "path": stage_path,
+            }), flush=True)
+        if final:
+            break
+
+    frame["accepted_samples"] = accepted[0]
+    scene.cycles.samples = stages[-1]
+
+def render_frames(job, snapshot, pristine_images):
+    """Render every texture of a job through every camera, resetting the curtain materials per texture"""
+    diffuse_paths = job["diffuse_paths"]
+    output_paths = job["output_paths"]
+
+    print(f"=== Blender Render Configuration ===")
+    print(f"Textures: {len(diffuse_paths)}")
+    print(f"Ratios: W={job['width_ratio']:.2f}, H={job['height_ratio']:.2f}")
+
+    scene = bpy.context.scene
+    deadline = time.perf_counter() + job["time_budget"] if job.get("time_budget") else None
+    phase_start = time.perf_counter()
+    configure_render(scene, job)
+    stages = progressive_stages(job, scene.cycles.samples)
+    if len(stages) > 1:
+        # Later stages reuse the synced scene, BVH and compiled kernels of the first
+        scene.render.use_persistent_data = True
+        print(f"Progressive stages: {', '.join(str(n) for n in stages)} samples")
+    cameras = resolve_cameras(scene, job.get("cameras"))
+    report["cameras"] = [camera.name for camera in cameras]
+    print(f"Cameras: {', '.join(report['cameras'])}")
+    add_timing("configure", time.perf_counter() - phase_start)
+
+    # Per-texture "full" or "curtains" (render only the curtains' screen region, cropped)
+    regions = job.get("regions") or ["full"] * len(diffuse_paths)
+    borders = [None] * len(cameras)
+    if "curtains" in regions:
+        scale = scene.render.resolution_percentage / 100.0
+        for camera_index, camera in enumerate(cameras):
+            scene.camera = camera
+            borders[camera_index] = curtain_border(scene, job["region_margin"], job["objects"])
+            print(REGION_PREFIX + json.dumps({
+                "camera_index": camera_index,
+                "resolution": [int(scene.render.resolution_x * scale), int(scene.render.resolution_y * scale)],
+                "border": borders[camera_index],
+            }), flush=True)
+
+    views = len(diffuse_paths) * len(cameras)
+    for index, (diffuse_path, output_path) in enumerate(zip(diffuse_paths, output_paths)):
+        print(f"Diffuse texture: {diffuse_path}")
+        phase_start = time.perf_counter()
+        restore_materials(snapshot)
+        release_job_images(pristine_images)
+        materials = apply_texture(diffuse_path, job)
+        add_timing("textures", time.perf_counter() - phase_start)
+        if not any(entry["texture"] for entry in materials):
+            warn(f"Frame {index + 1}: the texture was not applied to any curtain material")
+
+        # The scene, texture and compiled shaders stay loaded; each further view only re-samples
+        for camera_index, camera in enumerate(cameras):
+            view_path = view_output_path(output_path, camera_index, len(cameras))
+            print(f"--- Frame {index * len(cameras) + camera_index + 1}/{views} ---")
+            print(f"Camera: {camera.name}")
+            print(f"Output: {view_path}")
+            scene.camera = camera
+            border = borders[camera_index]
+            set_border(scene, border if regions[index] == "curtains" else None)
+            frame = {"index": index, "camera": camera.name, "camera_index": camera_index,
+                     "region": regions[index] if border else "full", "materials": materials}
+
+            set_output_format(scene, view_path)
+
+            phase_start = time.perf_counter()
+            begin_frame_stats()
+            render_view(scene, view_path, stages, frame, index * len(cameras) + camera_index + 1, deadline)
+            frame.update(end_frame_stats())
+            frame["seconds"] = round(time.perf_counter() - phase_start, 4)
+            add_timing("render", frame["seconds"])
+            for phase, seconds in frame["phases"].items():
+                report["render_phases"][phase] = round(report["render_phases"].get(phase, 0.0) + seconds, 4)
+            report["frames"].append(frame)
+
+def serve(defaults=None):
+    """Warm worker loop: one JSON job per stdin line, one result line per job on stdout.
+
+    `defaults` (worker-level --threads/--gpu_index) fill in settings a job leaves unset.
+    """
+    defaults = defaults or {}
+    snapshot = snapshot_materials()
+    pristine_images = set(img.name for img in bpy.data.images)
+    print(RESULT_PREFIX + json.dumps({"ready": True}), flush=True)
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            print(RESULT_PREFIX + json.dumps({"ok": False, "error": f"Bad job: {e}"}), flush=True)
+            continue
+        if job.get("command") == "shutdown":
+            break
+        if "jobs" in job:
+            print(RESULT_PREFIX + json.dumps({"ok": False, "error": "Send jobs one per line, not as a job list"}), flush=True)
+            continue
+        for key, value in defaults.items():
+            if not job.get(key):
+                job[key] = value
+
+        start = time.perf_counter()
+        try:
+            render_job(job, snapshot, pristine_images)
+            result = {"ok": True, "output_paths": job["output_paths"]}
+        except Exception as e:
+            print(f"Render failed: {e}")
+            result = {"ok": False, "error": str(e)}
+        result["render_time"] = time.perf_counter() - start
+        result["report_path"] = report_path_for(job)
+        print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+def prepare_scene(output_blend, manifest_path, extra):
+    """Save an optimized copy of the scene plus a manifest of the nodes each job patches"""
+    materials = {}
+    for material in curtain_materials():
+        if not material.use_nodes:
+            continue
+        found = find_patch_nodes(material)
+        if found:
+            principled, tex_node, mapping_node = found
+            materials[material.name] = {
+                "principled": principled.name,
+                "texture": tex_node.name,
+                "mapping": mapping_node.name if mapping_node and mapping_node.type == 'MAPPING' else None,
+            }
+
+    # Keep BVH and compiled shaders alive between frames of one session
+    bpy.context.scene.render.use_persistent_data = True
+
+    datablocks_before = sum(len(collection) for collection in (bpy.data.meshes, bpy.data.materials, bpy.data.images,
+                                                                bpy.data.node_groups, bpy.data.textures))
+    if hasattr(bpy.data, "orphans_purge"):
+        bpy.data.orphans_purge(do_local_ids=True, do_linked_ids=True, do_recursive=True)
+    else:
+        bpy.ops.outliner.orphans_purge(do_recursive=True)
+    datablocks_after = sum(len(collection) for collection in (bpy.data.meshes, bpy.data.materials, bpy.data.images,
+                                                               bpy.data.node_groups, bpy.data.textures))
+
+    os.makedirs(os.path.dirname(output_blend), exist_ok=True)
+    bpy.ops.wm.save_as_mainfile(filepath=output_blend, copy=True, compress=True)
+
+    manifest = dict(extra)
+    manifest.update({
+        "version": 1,
+        "blender_version": bpy.app.version_string,
+        "materials": materials,
+        "purged_datablocks": datablocks_before - datablocks_after,
+    })
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Prepared scene saved to {output_blend} ({manifest['purged_datablocks']} unused datablocks purged)")
+    print(RESULT_PREFIX + json.dumps({"ok": True, "manifest": manifest}), flush=True)
+
+def texel_density(scene, camera, obj, depsgraph):
+    """On-screen pixels per UV unit of `obj` seen from `camera` (95th percentile of its visible triangles)"""
+    import numpy as np
+
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    try:
+        if mesh.uv_layers.active is None:
+            return None
+        mesh.calc_loop_triangles()
+        count = len(mesh.loop_triangles)
+        if not count:
+            return None
+        coords = np.empty(len(mesh.vertices) * 3, np.float32)
+        mesh.vertices.foreach_get("co", coords)
+        uvs = np.empty(len(mesh.loops) * 2, np.float32)
+        mesh.uv_layers.active.data.foreach_get("uv", uvs)
+        tri_verts = np.empty(count * 3, np.int32)
+        mesh.loop_triangles.foreach_get("vertices", tri_verts)
+        tri_loops = np.empty(count * 3, np.int32)
+        mesh.loop_triangles.foreach_get("loops", tri_loops)
+        matrix_world = obj_eval.matrix_world.copy()
+    finally:
+        obj_eval.to_mesh_clear()
+
+    width, height = scene.render.resolution_x, scene.render.resolution_y
+    projection = camera.calc_matrix_camera(depsgraph, x=width, y=height,
+                                           scale_x=scene.render.pixel_aspect_x, scale_y=scene.render.pixel_aspect_y)
+    matrix = np.array(projection @ camera.matrix_world.inverted() @ matrix_world, np.float64)
+    points = np.c_[coords.reshape(-1, 3), np.ones(len(coords) // 3)] @ matrix.T
+    in_front = points[:, 3] > 1e-6
+    ndc = points[:, :2] / np.where(in_front, points[:, 3], 1.0)[:, None]
+
+    tris = tri_verts.reshape(-1, 3)
+    screen = (ndc[tris] * 0.5 + 0.5) * [width, height]
+    uv = uvs.reshape(-1, 2)[tri_loops.reshape(-1, 3)]
+
+    def area(p):
+        return 0.5 * np.abs((p[:, 1, 0] - p[:, 0, 0]) * (p[:, 2, 1] - p[:, 0, 1]) -
+                            (p[:, 2, 0] - p[:, 0, 0]) * (p[:, 1, 1] - p[:, 0, 1]))
+
+    screen_area, uv_area = area(screen), area(uv)
+    visible = in_front[tris].all(axis=1) & (np.abs(ndc[tris]) <= 1.0).all(axis=2).any(axis=1) & (uv_area > 1e-12)
+    if not visible.any():
+        return None
+    return float(np.percentile(np.sqrt(screen_area[visible] / uv_area[visible]), 95))
+
+def measure_footprint(output_path, extra):
+    """Write each curtain's texel density per camera and its base Mapping scale (for texture downsampling)"""
+    scene = bpy.context.scene
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    cameras = sorted((obj for obj in bpy.data.objects if obj.type == 'CAMERA'), key=lambda obj: obj.name)
+    default_camera = bpy.data.objects.get(DEFAULT_CAMERA) or scene.camera
+
+    objects = {}
+    for obj_name in curtain_objects:
+        obj = bpy.data.objects.get(obj_name)
+        if not obj or obj.type != 'MESH':
+            continue
+        # Smallest Mapping scale of the object's materials: the one that needs the most texels
+        scales = []
+        for material in curtain_materials([obj_name]):
+            found = material.use_nodes and find_patch_nodes(material)
+            if found and found[2] is not None and found[2].type == 'MAPPING':
+                scales.append(tuple(abs(value) for value in found[2].inputs['Scale'].default_value[:2]))
+        objects[obj_name] = {
+            "mapping_scale": [min(scale[0] for scale in scales), min(scale[1] for scale in scales)] if scales else None,
+            "density": {camera.name: texel_density(scene, camera, obj, depsgraph) for camera in cameras},
+        }
+
+    footprint = dict(extra)
+    footprint.update({
+        "version": 1,
+        "resolution": [scene.render.resolution_x, scene.render.resolution_y],
+        "resolution_percentage": scene.render.resolution_percentage,
+        "tier_percentages": {name: tier["resolution_percentage"] for name, tier in QUALITY_TIERS.items()},
+        "default_camera": default_camera.name if default_camera else None,
+        "objects": objects,
+    })
+    with open(output_path, "w") as f:
+        json.dump(footprint, f, indent=2)
+    print(f"Texel footprint of {len(objects)} curtain(s) over {len(cameras)} camera(s) saved to {output_path}")
+
+def load_jobs(job_path):
+    """Jobs in a job file: one job object, {"version": 1, "jobs": [...]}, or one job per line"""
+    with open(job_path) as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict) and "jobs" in data:
+        return [dict(job, version=job.get("version", data.get("version", JOB_VERSION))) for job in data["jobs"]]
+    return [data]
+
+def run_job_file(job_path):
+    """Render every job of a job file in this Blender session; returns False if any failed"""
+    snapshot = snapshot_materials()
+    pristine_images = set(img.name for img in bpy.data.images)
+    ok = True
+    for index, job in enumerate(load_jobs(job_path)):
+        try:
+            render_job(job, snapshot, pristine_images)
+        except Exception as e:
+            print(f"Render failed (job {index + 1}): {e}")
+            ok = False
+    return ok
+
+def parse_args(argv):
+    """Legacy positional command line, kept for running the script by hand (the node sends a job file)"""
+    # Optional settings come as --name=value anywhere after the positional arguments
+    options = dict(arg[2:].split("=", 1) for arg in argv[8:] if arg.startswith("--") and "=" in arg)
+    extra = [arg for arg in argv[8:] if not (arg.startswith("--") and "=" in arg)]
+
+    if len(argv) < 8 or len(extra) % 2:
+        print("Error: Not enough arguments provided")
+        print("Expected: diffuse_path output_path width_ratio height_ratio use_gpu samples use_denoising adaptive_sampling [diffuse_path output_path ...] [--quality=TIER] [--exclude_cpu=true] [--threads=N] [--regions=full,curtains,...] [--region_margin=F] [--report=PATH] [--cameras=NAME,PATTERN*,...] [--stages=8,32,...] [--time_budget=SECONDS]")
+        sys.exit(1)
+
+    # Extra (diffuse_path, output_path) pairs after the settings render as further batch frames
+    return {
+        "diffuse_paths": [argv[0]] + extra[0::2],
+        "output_paths": [argv[1]] + extra[1::2],
+        "width_ratio": float(argv[2]),
+        "height_ratio": float(argv[3]),
+        "use_gpu": argv[4].lower() == 'true',
+        "samples": int(argv[5]),
+        "use_denoising": argv[6].lower() == 'true',
+        "adaptive_sampling": argv[7].lower() == 'true',
+        "quality": options.get("quality", "custom"),
+        "exclude_cpu": options.get("exclude_cpu", "false").lower() == 'true',
+        "threads": int(options.get("threads", "0")),
+        "regions": options["regions"].split(",") if "regions" in options else None,
+        "region_margin": float(options.get("region_margin", "0.05")),
+        "report_path": options.get("report"),
+        "cameras": options["cameras"].split(",") if options.get("cameras") else None,
+        "progressive_stages": [int(n) for n in options["stages"].split(",")] if options.get("stages") else None,
+        "time_budget": float(options.get("time_budget", "0")),
+    }
+
+# --- Main Logic ---
+if __name__ == "__main__":
+    # Parse command line arguments
+    argv = sys.argv
+    argv = argv[argv.index("--") + 1:] if "--" in argv else []
+
+    if argv and argv[0] == "--serve":
+        options = dict(arg[2:].split("=", 1) for arg in argv[1:] if arg.startswith("--") and "=" in arg)
+        defaults = {}
+        if "threads" in options:
+            defaults["threads"] = int(options["threads"])
+        if "gpu_index" in options:
+            defaults["gpu_index"] = int(options["gpu_index"])
+        serve(defaults)
+    elif argv and argv[0].startswith("--job="):
+        # --job=PATH: a versioned JSON job description (or several, rendered in this session)
+        if not run_job_file(argv[0][len("--job="):]):
+            sys.exit(1)
+    elif argv and argv[0] == "--prepare":
+        # --prepare OUTPUT_BLEND MANIFEST_PATH [--key=value ...] (extra keys are copied into the manifest)
+        extra = dict(arg[2:].split("=", 1) for arg in argv[3:] if arg.startswith("--") and "=" in arg)
+        try:
+            prepare_scene(argv[1], argv[2], extra)
+        except Exception as e:
+            print(f"Scene preparation failed: {e}")
+            sys.exit(1)
+    elif argv and argv[0] == "--footprint":
+        # --footprint OUTPUT_JSON [--key=value ...] (extra keys are copied into the output)
+        extra = dict(arg[2:].split("=", 1) for arg in argv[2:] if arg.startswith("--") and "=" in arg)
+        try:
+            measure_footprint(argv[1], extra)
+        except Exception as e:
+            print(f"Footprint measurement failed: {e}")
+            sys.exit(1)
+    else:
+        try:
+            job = parse_args(argv)
+            render_job(job, snapshot_materials(), set(img.name for img in bpy.data.images))
+        except Exception as e:
+            print(f"Render failed: {e}")
+            sys.exit(1)
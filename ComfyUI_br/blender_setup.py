@@ -0,0 +1,120 @@
+"""
+Background Blender setup: download/verify off the import path, with a readiness state
+"""
+import os
+import json
+import platform
+import threading
+import subprocess
+
+NODE_DIR = os.path.dirname(os.path.abspath(__file__))
+# "background" starts setup on a thread at import; "lazy" waits for the first render
+SETUP_MODE = os.environ.get("BLENDER_SETUP_MODE", "background")
+VERSION_CACHE_PATH = os.path.join(NODE_DIR, "blender_version.json")
+VERSION_TIMEOUT = 10
+
+_lock = threading.Lock()
+_ready = threading.Event()
+_thread = None
+_state = {"status": "pending", "blender_path": None, "version": None, "error": None}
+
+
+def probe_version(blender_path):
+    """`blender --version` first line, cached on disk by the executable's (mtime, size)"""
+    stat = os.stat(blender_path)
+    key = {"path": blender_path, "mtime": stat.st_mtime, "size": stat.st_size}
+    try:
+        with open(VERSION_CACHE_PATH) as f:
+            cached = json.load(f)
+        if all(cached.get(name) == value for name, value in key.items()) and cached.get("version"):
+            return cached["version"]
+    except (OSError, ValueError):
+        pass
+
+    result = subprocess.run([blender_path, "--version"], capture_output=True, text=True, timeout=VERSION_TIMEOUT)
+    if result.returncode != 0:
+        raise RuntimeError(f"Blender test failed (exit code {result.returncode})")
+    version = result.stdout.split('\n')[0] if result.stdout else "Unknown version"
+
+    try:
+        temp_path = VERSION_CACHE_PATH + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(dict(key, version=version), f)
+        os.replace(temp_path, VERSION_CACHE_PATH)
+    except OSError as e:
+        print(f"ComfyUI Blender Render: Warning - Could not cache Blender version: {e}")
+    return version
+
+
+def setup_blender():
+    """Download (if needed), unblock and verify Blender; returns the executable path"""
+    from .blender_downloader import get_blender_path
+
+    system = platform.system()
+    if system not in ["Windows", "Linux"]:
+        raise RuntimeError(f"Unsupported platform {system}. Only Windows and Linux are supported.")
+
+    print(f"ComfyUI Blender Render: Setting up for {system}")
+    # Auto-download Blender if needed
+    blender_path = get_blender_path(NODE_DIR)
+
+    # Windows: Unblock the executable
+    if system == "Windows" and os.path.exists(blender_path):
+        try:
+            subprocess.run([
+                "powershell", "-Command", f"Unblock-File -Path '{blender_path}'"
+            ], check=False, capture_output=True)
+            print(f"ComfyUI Blender Render: Unblocked Blender executable")
+        except Exception as e:
+            print(f"ComfyUI Blender Render: Warning - Could not unblock file: {e}")
+
+    # Verify Blender executable works (following Linux guide)
+    try:
+        version = probe_version(blender_path)
+        _state["version"] = version
+        print(f"ComfyUI Blender Render: Verified - {version}")
+    except Exception as e:
+        print(f"ComfyUI Blender Render: Warning - Could not verify Blender: {e}")
+
+    print(f"ComfyUI Blender Render: Ready! Blender at {blender_path}")
+    return blender_path
+
+
+def _run():
+    try:
+        _state["blender_path"] = setup_blender()
+        _state["status"] = "ready"
+    except Exception as e:
+        print(f"ComfyUI Blender Render: Setup error - {e}")
+        _state["error"] = e
+        _state["status"] = "failed"
+    finally:
+        _ready.set()
+
+
+def start_setup():
+    """Start setup on a daemon thread (once, or again after a failure); returns immediately"""
+    global _thread
+    with _lock:
+        if _thread is None or _state["status"] == "failed":
+            _ready.clear()
+            _state.update(status="running", error=None)
+            _thread = threading.Thread(target=_run, name="blender-setup", daemon=True)
+            _thread.start()
+
+
+def setup_status():
+    """Snapshot of the readiness state: status, blender_path, version, error"""
+    return dict(_state)
+
+
+def wait_for_blender(timeout=None):
+    """Blender executable path, starting setup if needed and blocking only until it finishes"""
+    if not _ready.is_set() or _state["status"] == "failed":
+        start_setup()
+        print("ComfyUI Blender Render: Waiting for Blender setup to finish...")
+        if not _ready.wait(timeout):
+            raise TimeoutError(f"Blender setup did not finish within {timeout}s")
+    if _state["status"] != "ready":
+        raise RuntimeError(f"Blender setup failed: {_state['error']}")
+    return _state["blender_path"]
@@ -0,0 +1,177 @@
+"""
+Persistent (warm) Blender workers for the Blender Render node
+"""
+import json
+import queue
+import threading
+import subprocess
+import time
+from .blender_process import popen_kwargs, kill_process_tree, check_interrupted, POLL_INTERVAL
+
+RESULT_PREFIX = "@@BLENDER_RESULT@@ "
+STARTUP_TIMEOUT = 300
+
+# Latency history for cold (one process per render) and warm renders
+_latency = {"cold": [], "warm": []}
+_latency_lock = threading.Lock()
+LATENCY_HISTORY = 100
+
+
+class BlenderWorker:
+    """A long-lived `blender -b scene.blend -P blender_render_script.py -- --serve` process.
+
+    The scene is loaded once; jobs are sent as JSON lines on stdin and the
+    script answers each with one RESULT_PREFIX line on stdout.
+    """
+
+    def __init__(self, blender_path, blend_file_path, script_path, cwd=None, extra_args=None):
+        self.blender_path = blender_path
+        self.blend_file_path = blend_file_path
+        self.script_path = script_path
+        self.cwd = cwd
+        self.extra_args = list(extra_args or [])
+        self.process = None
+        self.jobs_done = 0
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._reader = None
+        # Receives the worker's log lines while a job runs (progress parsing)
+        self._line_handler = None
+
+    def start(self, cancel=None):
+        cmd = [
+            self.blender_path,
+            "-b",
+            self.blend_file_path,
+            "-P", self.script_path,
+            "--",
+            "--serve",
+        ] + self.extra_args
+
+        print("Starting warm Blender worker:", " ".join([f'"{arg}"' if ' ' in arg else arg for arg in cmd]))
+        self._results = queue.Queue()
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            cwd=self.cwd,
+            **popen_kwargs()
+        )
+        self._reader = threading.Thread(target=self._read_output, args=(self.process, self._results), daemon=True)
+        self._reader.start()
+
+        try:
+            ready = self._wait_result(STARTUP_TIMEOUT, cancel)
+        except BaseException:
+            self.kill()
+            raise
+        if not ready.get("ready"):
+            self.kill()
+            raise RuntimeError(f"Warm Blender worker failed to start: {ready.get('error', 'unknown error')}")
+
+    def _read_output(self, process, results):
+        for line in process.stdout:
+            if line.startswith(RESULT_PREFIX):
+                try:
+                    results.put(json.loads(line[len(RESULT_PREFIX):]))
+                except ValueError as e:
+                    results.put({"ok": False, "error": f"Unreadable worker result: {e}"})
+            elif self._line_handler is not None:
+                self._line_handler(line)
+        process.wait()
+        results.put({"ok": False, "error": f"Blender worker exited with code {process.returncode}"})
+
+    def _wait_result(self, timeout, cancel=None):
+        """Next result line; `cancel` (set by the submitting thread) replaces polling ComfyUI here"""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            try:
+                return self._results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                pass
+            if cancel is None:
+                check_interrupted()
+            elif cancel.is_set():
+                raise InterruptedError("Blender render cancelled")
+            if deadline is not None and time.monotonic() > deadline:
+                return {"ok": False, "timeout": True, "error": f"No response from Blender worker after {timeout}s"}
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def render(self, job, timeout=None, progress=None, cancel=None):
+        """Send one job and block until the worker reports back.
+
+        A worker that times out or is interrupted is killed (with its whole
+        process tree) and restarted on the next job.
+        """
+        with self._lock:
+            if not self.is_alive():
+                self.start(cancel)
+
+            self._line_handler = progress.feed if progress is not None else None
+            try:
+                try:
+                    self.process.stdin.write(json.dumps(job) + "\n")
+                    self.process.stdin.flush()
+                except (BrokenPipeError, OSError) as e:
+                    self.kill()
+                    raise RuntimeError(f"Lost connection to Blender worker: {e}") from e
+
+                try:
+                    result = self._wait_result(timeout, cancel)
+                except BaseException:
+                    self.kill()
+                    raise
+            finally:
+                self._line_handler = None
+
+            if result.get("timeout"):
+                self.kill()
+                raise TimeoutError(f"Blender render exceeded the {timeout}s time limit and the worker was killed")
+            if not result.get("ok"):
+                if not self.is_alive():
+                    self.kill()
+                raise RuntimeError(f"Warm Blender render failed: {result.get('error', 'unknown error')}")
+
+            self.jobs_done += 1
+            if progress is not None:
+                progress.finish()
+            return result
+
+    def kill(self):
+        process = self.process
+        self.process = None
+        if process is not None:
+            kill_process_tree(process)
+
+    def stop(self):
+        process = self.process
+        self.process = None
+        if process is None or process.poll() is not None:
+            return
+        try:
+            process.stdin.write(json.dumps({"command": "shutdown"}) + "\n")
+            process.stdin.flush()
+            process.wait(timeout=10)
+        except Exception:
+            kill_process_tree(process)
+
+
+def record_latency(mode, seconds):
+    """Record a render latency ("cold" or "warm") and return a one-line comparison"""
+    with _latency_lock:
+        history = _latency[mode]
+        history.append(seconds)
+        del history[:-LATENCY_HISTORY]
+        summary = []
+        for name in ("cold", "warm"):
+            values = _latency[name]
+            if values:
+                summary.append(f"{name} avg {sum(values) / len(values):.2f}s over {len(values)}")
+            else:
+                summary.append(f"{name} n/a")
+    return f"Render latency ({mode}): {seconds:.2f}s | " + ", ".join(summary)
@@ -0,0 +1,189 @@
+"""
+Raw pixel handoff between ComfyUI and Blender through memory-backed files
+"""
+import os
+import struct
+import tempfile
+import numpy as np
+
+# Raw texture file: magic, width, height (little-endian uint32), then top-down RGBA8 rows
+RAW_MAGIC = b"RAW8"
+RAW_HEADER = struct.Struct("<4sII")
+RAW_EXTENSION = ".rgba"
+
+TRANSPORTS = ["png", "shared_memory"]
+
+# Render output precision -> file extension Blender writes (8bit follows the transport: .png or .bmp)
+OUTPUT_DEPTHS = {"8bit": None, "16bit": ".tif", "half_float": ".exr"}
+
+
+def get_shared_memory_dir():
+    """Directory backed by RAM where available (/dev/shm), otherwise the system temp dir"""
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        return shm
+    return tempfile.gettempdir()
+
+
+def write_raw_texture(tex_array, path):
+    """Write an [H,W,C] uint8 array as a raw RGBA8 file via a memory map"""
+    height, width = tex_array.shape[:2]
+    channels = tex_array.shape[2] if tex_array.ndim == 3 else 1
+
+    with open(path, "wb") as f:
+        f.write(RAW_HEADER.pack(RAW_MAGIC, width, height))
+        f.truncate(RAW_HEADER.size + width * height * 4)
+
+    pixels = np.memmap(path, dtype=np.uint8, mode="r+", offset=RAW_HEADER.size, shape=(height, width, 4))
+    if channels == 1:
+        pixels[..., :3] = tex_array.reshape(height, width, 1)
+        pixels[..., 3] = 255
+    elif channels == 3:
+        pixels[..., :3] = tex_array
+        pixels[..., 3] = 255
+    else:
+        pixels[...] = tex_array[..., :4]
+    pixels.flush()
+    del pixels
+    return path
+
+
+def read_bmp(path):
+    """Decode an uncompressed 24/32-bit BMP into a top-down [H,W,3] uint8 RGB array"""
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    header = data[:54].tobytes()
+    if header[:2] != b"BM":
+        raise ValueError(f"Not a BMP file: {path}")
+
+    pixel_offset = struct.unpack_from("<I", header, 10)[0]
+    width, height = struct.unpack_from("<ii", header, 18)
+    bits_per_pixel = struct.unpack_from("<H", header, 28)[0]
+    compression = struct.unpack_from("<I", header, 30)[0]
+    if bits_per_pixel not in (24, 32) or compression not in (0, 3):
+        raise ValueError(f"Unsupported BMP layout ({bits_per_pixel} bpp, compression {compression}): {path}")
+
+    bytes_per_pixel = bits_per_pixel // 8
+    row_size = (width * bytes_per_pixel + 3) & ~3
+    rows = data[pixel_offset:pixel_offset + row_size * abs(height)].reshape(abs(height), row_size)
+    pixels = rows[:, :width * bytes_per_pixel].reshape(abs(height), width, bytes_per_pixel)
+
+    # Bottom-up unless the height is negative; BGR(A) channel order
+    if height > 0:
+        pixels = pixels[::-1]
+    rgb = np.ascontiguousarray(pixels[..., 2::-1])
+    del data
+    return rgb
+
+
+TIFF_TYPES = {3: "H", 4: "I"}
+
+
+def read_tiff(path):
+    """Decode an uncompressed, interleaved 8/16-bit RGB(A) TIFF into a top-down [H,W,3] array (uint8 or uint16)"""
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    order = {b"II": "<", b"MM": ">"}.get(data[:2].tobytes())
+    if order is None or struct.unpack_from(order + "H", data, 2)[0] != 42:
+        raise ValueError(f"Not a TIFF file: {path}")
+
+    ifd = struct.unpack_from(order + "I", data, 4)[0]
+    tags = {}
+    for index in range(struct.unpack_from(order + "H", data, ifd)[0]):
+        tag, kind, count, value = struct.unpack_from(order + "HHI4s", data, ifd + 2 + index * 12)
+        code = TIFF_TYPES.get(kind)
+        if code is None:
+            continue
+        size = struct.calcsize(code) * count
+        raw = value if size <= 4 else data[struct.unpack(order + "I", value)[0]:][:size].tobytes()
+        tags[tag] = struct.unpack_from(order + code * count, raw)
+
+    width, height = tags[256][0], tags[257][0]
+    bits = tags.get(258, (1,))[0]
+    channels = tags.get(277, (1,))[0]
+    if tags.get(259, (1,))[0] != 1 or tags.get(284, (1,))[0] != 1 or bits not in (8, 16) or channels < 3:
+        raise ValueError(f"Unsupported TIFF layout ({bits} bit, {channels} channels, "
+                         f"compression {tags.get(259, (1,))[0]}): {path}")
+
+    dtype = np.dtype(np.uint8) if bits == 8 else np.dtype(order + "u2")
+    offsets, counts = tags[273], tags[279]
+    if all(offsets[i] + counts[i] == offsets[i + 1] for i in range(len(offsets) - 1)):
+        strips = data[offsets[0]:offsets[0] + sum(counts)]
+    else:
+        strips = np.concatenate([data[offset:offset + count] for offset, count in zip(offsets, counts)])
+    pixels = strips[:width * height * channels * dtype.itemsize].view(dtype).reshape(height, width, channels)
+    rgb = np.array(pixels[..., :3], dtype=dtype.newbyteorder("="))  # Copy: the file is deleted after reading
+    del data
+    return rgb
+
+
+EXR_PIXEL_TYPES = {1: np.dtype("<f2"), 2: np.dtype("<f4"), 0: np.dtype("<u4")}
+
+
+def read_exr(path):
+    """Decode an uncompressed scanline OpenEXR into a top-down [H,W,3] float32 RGB array (scene-linear)"""
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    magic, version = struct.unpack_from("<II", data, 0)
+    if magic != 20000630:
+        raise ValueError(f"Not an OpenEXR file: {path}")
+    if version & 0x1A00:
+        raise ValueError(f"Tiled, deep or multi-part OpenEXR is not supported: {path}")
+
+    position = 8
+    header = {}
+    while data[position] != 0:
+        name_end = position + bytes(data[position:position + 256]).index(b"\0")
+        type_end = name_end + 1 + bytes(data[name_end + 1:name_end + 257]).index(b"\0")
+        size = struct.unpack_from("<i", data, type_end + 1)[0]
+        header[bytes(data[position:name_end]).decode()] = bytes(data[type_end + 5:type_end + 5 + size])
+        position = type_end + 5 + size
+    position += 1
+
+    channels = []
+    chlist = header["channels"]
+    while chlist[0] != 0:
+        name, chlist = chlist.split(b"\0", 1)
+        pixel_type = struct.unpack_from("<i", chlist)[0]
+        channels.append((name.decode(), EXR_PIXEL_TYPES[pixel_type]))
+        chlist = chlist[16:]
+    if header["compression"][0] != 0:
+        raise ValueError(f"Compressed OpenEXR is not supported (compression {header['compression'][0]}): {path}")
+
+    x_min, y_min, x_max, y_max = struct.unpack("<iiii", header["dataWindow"])
+    width, height = x_max - x_min + 1, y_max - y_min + 1
+    offsets = np.frombuffer(data[position:position + 8 * height].tobytes(), dtype="<u8")
+
+    # Uncompressed: one scanline per chunk (y, byte count, then each channel's row in chlist order)
+    row_dtype = np.dtype([("y", "<i4"), ("size", "<i4")] + [(name, dtype, (width,)) for name, dtype in channels])
+    first = int(offsets.min())
+    if np.array_equal(np.sort(offsets), first + np.arange(height, dtype=np.uint64) * row_dtype.itemsize):
+        rows = np.frombuffer(data[first:first + height * row_dtype.itemsize].tobytes(), dtype=row_dtype)
+    else:
+        rows = np.concatenate([np.frombuffer(data[offset:offset + row_dtype.itemsize].tobytes(), dtype=row_dtype)
+                               for offset in offsets.tolist()])
+    order = np.argsort(rows["y"], kind="stable")
+
+    names = [name for name, _ in channels]
+    rgb = np.empty((height, width, 3), dtype=np.float32)
+    for index, name in enumerate("RGB"):
+        source = name if name in names else names[0]
+        rgb[..., index] = rows[source][order]
+    del data
+    return rgb
+
+
+def linear_to_srgb(linear):
+    """sRGB transfer function for scene-linear [0,1] values (matches the "Standard" view transform)"""
+    linear = np.clip(linear, 0.0, 1.0)
+    return np.where(linear <= 0.0031308, linear * 12.92, 1.055 * np.power(linear, 1 / 2.4) - 0.055).astype(np.float32)
+
+
+def read_output(path):
+    """Decode a render output by extension: uint8 for PNG/BMP, uint16 for 16-bit TIFF, float32 for EXR"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".bmp":
+        return read_bmp(path)
+    if extension in (".tif", ".tiff"):
+        return read_tiff(path)
+    if extension == ".exr":
+        return read_exr(path)
+    from PIL import Image
+    return np.array(Image.open(path).convert("RGB"))
@@ -0,0 +1,173 @@
+"""
+Content-addressed cache of Blender render results (in-memory LRU + on-disk store)
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+NODE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("BLENDER_RENDER_CACHE_DIR", os.path.join(NODE_DIR, "render_cache"))
+MEMORY_LIMIT_MB = float(os.environ.get("BLENDER_RENDER_CACHE_MEMORY_MB", "512"))
+DISK_LIMIT_MB = float(os.environ.get("BLENDER_RENDER_CACHE_DISK_MB", "2048"))
+
+# (path) -> (mtime, size, sha256) so unchanged files are hashed only once per process
+_file_hashes = {}
+_file_hash_lock = threading.Lock()
+
+
+def file_hash(path):
+    """SHA-256 of a file's contents, memoised on (mtime, size)"""
+    stat = os.stat(path)
+    with _file_hash_lock:
+        cached = _file_hashes.get(path)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    value = digest.hexdigest()
+
+    with _file_hash_lock:
+        _file_hashes[path] = (stat.st_mtime, stat.st_size, value)
+    return value
+
+
+def _scene_digest(blend_file_path, script_path, params):
+    digest = hashlib.sha256()
+    digest.update(file_hash(blend_file_path).encode())
+    digest.update(file_hash(script_path).encode())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest
+
+
+def render_key(texture, blend_file_path, script_path, params):
+    """Hash of the texture pixels, scene file, render script and every render parameter"""
+    digest = _scene_digest(blend_file_path, script_path, params)
+    pixels = np.ascontiguousarray(texture.detach().cpu().numpy())
+    digest.update(str((pixels.shape, pixels.dtype.str)).encode())
+    digest.update(pixels.data)
+    return digest.hexdigest()
+
+
+def settings_key(blend_file_path, script_path, params):
+    """Hash of the scene file, render script and render parameters (no texture pixels)"""
+    return _scene_digest(blend_file_path, script_path, params).hexdigest()
+
+
+def plate_key(blend_file_path, script_path, params):
+    """Key of the full-frame background plate shared by region renders with the same settings"""
+    digest = _scene_digest(blend_file_path, script_path, params)
+    digest.update(b"background-plate")
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """LRU of [B,H,W,3] renders (uint8, uint16 or float16), backed by .npy files with a size cap"""
+
+    def __init__(self, cache_dir=CACHE_DIR, memory_limit_mb=MEMORY_LIMIT_MB, disk_limit_mb=DISK_LIMIT_MB):
+        self.cache_dir = cache_dir
+        self.memory_limit = int(memory_limit_mb * 1024 * 1024)
+        self.disk_limit = int(disk_limit_mb * 1024 * 1024)
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get(self, key):
+        with self._lock:
+            frames = self._memory.get(key)
+            if frames is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return frames
+
+        path = self._path(key)
+        try:
+            frames = np.load(path)
+            os.utime(path)  # mtime doubles as the disk LRU clock
+        except (OSError, ValueError):
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self.stats["disk_hits"] += 1
+            self._remember(key, frames)
+        return frames
+
+    def put(self, key, frames):
+        frames = np.ascontiguousarray(frames)
+        with self._lock:
+            self._remember(key, frames)
+
+        if self.disk_limit <= 0:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = self._path(key) + ".tmp"
+            with open(temp_path, "wb") as f:
+                np.save(f, frames)
+            os.replace(temp_path, self._path(key))
+            self._evict_disk()
+        except OSError as e:
+            print(f"Render cache: could not write {key}: {e}")
+
+    def _remember(self, key, frames):
+        if frames.nbytes > self.memory_limit:
+            return
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key).nbytes
+        self._memory[key] = frames
+        self._memory_bytes += frames.nbytes
+        while self._memory_bytes > self.memory_limit:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npy"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.disk_limit:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                with self._lock:
+                    self.stats["evictions"] += 1
+            except OSError:
+                pass
+
+    def summary(self):
+        with self._lock:
+            stats = dict(self.stats)
+            entries = len(self._memory)
+            memory_mb = self._memory_bytes / (1024 * 1024)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        hit_rate = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return (f"Render cache: {stats['memory_hits']} memory hits, {stats['disk_hits']} disk hits, "
+                f"{stats['misses']} misses ({hit_rate:.0%} hit rate), {stats['evictions']} evictions, "
+                f"{entries} entries / {memory_mb:.1f} MB in memory")
+
+
+render_cache = RenderCache()
@@ -0,0 +1,242 @@
+"""
+Pool of warm Blender workers sharing one bounded job queue
+"""
+import os
+import atexit
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, wait
+
+from .blender_worker import BlenderWorker
+from .blender_process import check_interrupted, POLL_INTERVAL
+
+# Sized from the environment so the pool fits the container's CPU quota
+POOL_SIZE = int(os.environ.get("BLENDER_POOL_SIZE", "1"))
+# Jobs that may wait for a worker before submit() applies backpressure (0 = 2 x pool size)
+QUEUE_SIZE = int(os.environ.get("BLENDER_POOL_QUEUE", "0"))
+# Comma-separated GPU indices assigned round-robin to workers, e.g. "0,1"
+POOL_GPUS = os.environ.get("BLENDER_POOL_GPUS", "")
+# Render threads per worker (0 = split the available CPUs among the jobs running at dispatch time)
+POOL_THREADS = int(os.environ.get("BLENDER_POOL_THREADS", "0"))
+# How long submit() blocks on a full queue before giving up
+SUBMIT_TIMEOUT = float(os.environ.get("BLENDER_POOL_SUBMIT_TIMEOUT", "600"))
+# How long an interrupted render waits for its worker to kill Blender
+CANCEL_TIMEOUT = 15
+
+_registry_lock = threading.Lock()
+_pools = {}
+
+
+def available_cpus():
+    """CPUs this process may use, honouring affinity and a cgroup v2 CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+class RenderPool:
+    """N BlenderWorkers fed from one bounded queue.
+
+    A dispatcher hands each job to the most recently used idle worker (a LIFO
+    stack), so sequential jobs keep landing on the same warm Blender instead
+    of cold-starting every worker in turn. Each worker gets its own GPU index
+    when BLENDER_POOL_GPUS is set. On CPU,
+    a job that leaves `threads` at 0 gets the available CPUs divided by the
+    number of jobs running when it starts, so a lone job uses every core.
+    Interrupts are polled by the submitting thread only; the worker is told
+    through the job's cancel event and kills its Blender process.
+    """
+
+    def __init__(self, blender_path, blend_file_path, script_path, cwd=None, size=POOL_SIZE, queue_size=QUEUE_SIZE):
+        self.size = max(1, size)
+        self.jobs = queue.Queue(maxsize=queue_size or 2 * self.size)
+        self.workers = [
+            BlenderWorker(blender_path, blend_file_path, script_path, cwd=cwd, extra_args=self._worker_args(i))
+            for i in range(self.size)
+        ]
+        self.created = time.monotonic()
+        self._stats_lock = threading.Lock()
+        self._busy = [0.0] * self.size
+        self._jobs_done = [0] * self.size
+        self._waits = deque(maxlen=100)
+        self._running = 0
+        # Idle worker indices, most recently used last; worker 0 is tried first
+        self._idle = list(reversed(range(self.size)))
+        self._idle_changed = threading.Condition()
+        self._inboxes = [queue.Queue(maxsize=1) for _ in range(self.size)]
+        self._threads = [threading.Thread(target=self._dispatch, daemon=True)]
+        self._threads += [threading.Thread(target=self._run, args=(index,), daemon=True) for index in range(self.size)]
+        for thread in self._threads:
+            thread.start()
+
+    def _worker_args(self, index):
+        gpus = [g.strip() for g in POOL_GPUS.split(",") if g.strip()]
+        if gpus:
+            return [f"--gpu_index={gpus[index % len(gpus)]}"]
+        if POOL_THREADS:
+            return [f"--threads={POOL_THREADS}"]
+        return []
+
+    def _job_threads(self, job, running):
+        """The job with a CPU thread budget for `running` concurrent jobs (unchanged when it sets its own)"""
+        if job.get("threads") or POOL_THREADS:
+            return job
+        return dict(job, threads=max(1, available_cpus() // max(1, running)))
+
+    def _next_worker(self):
+        """Pop the idle worker to use next: the most recently used one whose Blender is still running"""
+        with self._idle_changed:
+            while not self._idle:
+                self._idle_changed.wait()
+            warm = [index for index in self._idle if self.workers[index].is_alive()]
+            index = warm[-1] if warm else self._idle[-1]
+            self._idle.remove(index)
+            return index
+
+    def _dispatch(self):
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                for inbox in self._inboxes:
+                    inbox.put(None)
+                return
+            self._inboxes[self._next_worker()].put(item)
+
+    def _run(self, index):
+        worker = self.workers[index]
+        while True:
+            item = self._inboxes[index].get()
+            if item is None:
+                worker.stop()
+                return
+            try:
+                self._render_item(index, worker, item)
+            finally:
+                with self._idle_changed:
+                    self._idle.append(index)
+                    self._idle_changed.notify()
+
+    def _render_item(self, index, worker, item):
+        future, job, timeout, progress, queued_at, cancel = item
+        if cancel.is_set() or not future.set_running_or_notify_cancel():
+            return
+
+        started = time.monotonic()
+        with self._stats_lock:
+            self._waits.append(started - queued_at)
+            self._running += 1
+            job = self._job_threads(job, self._running)
+        try:
+            future.set_result(worker.render(job, timeout=timeout, progress=progress, cancel=cancel))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._stats_lock:
+                self._running -= 1
+                self._busy[index] += time.monotonic() - started
+                self._jobs_done[index] += 1
+
+    def submit(self, job, timeout=None, progress=None, cancel=None):
+        """Queue a job; blocks while the queue is full (backpressure) and returns a Future.
+
+        Setting `cancel` (a threading.Event) drops a queued job or kills the worker running it.
+        """
+        future = Future()
+        cancel = cancel or threading.Event()
+        try:
+            self.jobs.put((future, job, timeout, progress, time.monotonic(), cancel), timeout=SUBMIT_TIMEOUT)
+        except queue.Full:
+            raise RuntimeError(f"Blender render queue is full ({self.jobs.maxsize} jobs waiting for {SUBMIT_TIMEOUT}s)")
+        return future
+
+    def render(self, job, timeout=None, progress=None):
+        """Submit a job and wait for it, staying responsive to ComfyUI interrupts"""
+        return self.render_all([job], timeout=timeout, progresses=[progress])[0]
+
+    def render_all(self, jobs, timeout=None, progresses=None):
+        """Submit jobs that run side by side (the parts of a split batch) and wait for all of them.
+
+        Every job finishes before the first error is raised, so no worker is
+        still writing into the scratch dir the caller is about to empty.
+        """
+        progresses = progresses or [None] * len(jobs)
+        if len(jobs) > 1:
+            # The parts start together: split the CPUs between them up front
+            jobs = [self._job_threads(job, len(jobs)) for job in jobs]
+        cancel = threading.Event()
+        futures = [self.submit(job, timeout=timeout, progress=progress, cancel=cancel)
+                   for job, progress in zip(jobs, progresses)]
+        while wait(futures, timeout=POLL_INTERVAL).not_done:
+            try:
+                check_interrupted()
+            except BaseException:
+                # Only this thread polls ComfyUI (the check clears the flag); stop the workers and
+                # wait for their Blender processes to die before the caller empties the scratch dir
+                cancel.set()
+                for future in futures:
+                    if not future.cancel():
+                        try:
+                            future.exception(timeout=CANCEL_TIMEOUT)
+                        except Exception:
+                            pass
+                raise
+        return [future.result() for future in futures]
+
+    def stats(self):
+        with self._stats_lock:
+            elapsed = max(time.monotonic() - self.created, 1e-6)
+            waits = list(self._waits)
+            return {
+                "workers": self.size,
+                "queue_depth": self.jobs.qsize(),
+                "queue_capacity": self.jobs.maxsize,
+                "jobs_done": list(self._jobs_done),
+                "utilization": [busy / elapsed for busy in self._busy],
+                "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+                "max_wait": max(waits) if waits else 0.0,
+            }
+
+    def summary(self):
+        stats = self.stats()
+        utilization = ", ".join(f"{u:.0%}" for u in stats["utilization"])
+        return (f"Render pool: {stats['workers']} workers, queue {stats['queue_depth']}/{stats['queue_capacity']}, "
+                f"utilization [{utilization}], wait avg {stats['avg_wait']:.2f}s / max {stats['max_wait']:.2f}s")
+
+    def shutdown(self):
+        self.jobs.put(None)
+        for thread in self._threads:
+            thread.join(timeout=15)
+
+
+def get_pool(blender_path, blend_file_path, script_path, cwd=None):
+    """Return the shared render pool for this Blender build and scene"""
+    key = (blender_path, os.path.abspath(blend_file_path))
+    with _registry_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = RenderPool(blender_path, blend_file_path, script_path, cwd=cwd)
+            _pools[key] = pool
+    return pool
+
+
+def shutdown_pools():
+    with _registry_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+atexit.register(shutdown_pools)
@@ -0,0 +1,119 @@
+"""
+Prepared (pre-baked) copies of .blend scenes with a sidecar manifest
+"""
+import os
+import json
+import threading
+
+from .blender_process import run_blender
+from .render_cache import file_hash
+
+NODE_DIR = os.path.dirname(os.path.abspath(__file__))
+PREPARED_DIR = os.path.join(NODE_DIR, "prepared_scenes")
+MANIFEST_VERSION = 1
+
+_prepare_lock = threading.Lock()
+
+
+def prepared_paths(blend_file_path):
+    """(prepared .blend, manifest .json) for a source scene"""
+    name = os.path.splitext(os.path.basename(blend_file_path))[0]
+    return (os.path.join(PREPARED_DIR, f"{name}.blend"),
+            os.path.join(PREPARED_DIR, f"{name}.json"))
+
+
+def footprint_path(blend_file_path):
+    """Cached --footprint output (curtain texel density per camera) for a source scene"""
+    name = os.path.splitext(os.path.basename(blend_file_path))[0]
+    return os.path.join(PREPARED_DIR, f"{name}.footprint.json")
+
+
+def _load_matching(path, blender_path, blend_file_path, script_path):
+    """JSON written by a script mode, if it was made from the current source, Blender and script"""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    expected = {
+        "version": MANIFEST_VERSION,
+        "source_hash": file_hash(blend_file_path),
+        "script_hash": file_hash(script_path),
+        "blender_path": blender_path,
+    }
+    for key, value in expected.items():
+        if manifest.get(key) != value:
+            return None
+    return manifest
+
+
+def _source_args(blender_path, blend_file_path, script_path):
+    return [
+        f"--source_hash={file_hash(blend_file_path)}",
+        f"--script_hash={file_hash(script_path)}",
+        f"--blender_path={blender_path}",
+    ]
+
+
+def valid_prepared_scene(blender_path, blend_file_path, script_path):
+    """Path of the prepared copy if its manifest matches the current source, Blender and script"""
+    prepared_blend, manifest_path = prepared_paths(blend_file_path)
+    if not os.path.exists(prepared_blend):
+        return None
+    if _load_matching(manifest_path, blender_path, blend_file_path, script_path) is None:
+        return None
+    return prepared_blend
+
+
+def prepare_scene(blender_path, blend_file_path, script_path, cwd=None, timeout=None):
+    """Run the render script's --prepare mode: record patch nodes, purge unused data, save a copy"""
+    prepared_blend, manifest_path = prepared_paths(blend_file_path)
+    os.makedirs(PREPARED_DIR, exist_ok=True)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)  # The manifest is written last, so its presence marks a complete copy
+
+    cmd = [
+        blender_path,
+        "-b",
+        blend_file_path,
+        "-P", script_path,
+        "--",
+        "--prepare",
+        prepared_blend,
+        manifest_path,
+    ] + _source_args(blender_path, blend_file_path, script_path)
+    print(f"Preparing scene: {blend_file_path} -> {prepared_blend}")
+    run_blender(cmd, cwd=cwd, timeout=timeout)
+    return prepared_blend
+
+
+def resolve_scene(blender_path, blend_file_path, script_path, prepare=False, cwd=None, timeout=None):
+    """Scene file to render: the prepared copy when valid (creating it if `prepare`), else the source"""
+    with _prepare_lock:
+        prepared = valid_prepared_scene(blender_path, blend_file_path, script_path)
+        if prepared is None and prepare:
+            try:
+                prepare_scene(blender_path, blend_file_path, script_path, cwd=cwd, timeout=timeout)
+                prepared = valid_prepared_scene(blender_path, blend_file_path, script_path)
+            except Exception as e:
+                print(f"Warning: Scene preparation failed, rendering the source scene: {e}")
+
+    if prepared:
+        print(f"Using prepared scene: {prepared}")
+        return prepared
+    return blend_file_path
+
+
+def scene_footprint(blender_path, blend_file_path, script_path, cwd=None, timeout=None):
+    """Run the render script's --footprint mode once per scene; returns the cached measurement"""
+    path = footprint_path(blend_file_path)
+    with _prepare_lock:
+        footprint = _load_matching(path, blender_path, blend_file_path, script_path)
+        if footprint is None:
+            os.makedirs(PREPARED_DIR, exist_ok=True)
+            cmd = [blender_path, "-b", blend_file_path, "-P", script_path, "--", "--footprint", path]
+            print(f"Measuring curtain texel footprint: {blend_file_path}")
+            run_blender(cmd + _source_args(blender_path, blend_file_path, script_path), cwd=cwd, timeout=timeout)
+            footprint = _load_matching(path, blender_path, blend_file_path, script_path)
+    return footprint
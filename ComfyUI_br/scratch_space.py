@@ -0,0 +1,195 @@
+"""
+Per-job scratch directories on a fast filesystem, with a quota and crash cleanup
+"""
+import os
+import time
+import uuid
+import atexit
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from .pixel_transport import get_shared_memory_dir
+
+# Shared-memory filesystems smaller than this (Docker's default /dev/shm is 64 MB) are skipped for the temp dir
+MIN_SHARED_MEMORY_MB = float(os.environ.get("BLENDER_SCRATCH_MIN_SHM_MB", "512"))
+# Total size of the scratch root (all processes) above which new jobs are refused
+SCRATCH_QUOTA_MB = float(os.environ.get("BLENDER_SCRATCH_QUOTA_MB", "2048"))
+# Share of the filesystem's space (used by the scratch root + free) the quota may never exceed
+FILESYSTEM_SHARE = 0.9
+# Emptied job directories kept for reuse by later jobs
+SCRATCH_REUSE = int(os.environ.get("BLENDER_SCRATCH_REUSE", "8"))
+
+LOCK_NAME = ".owner.lock"
+# Owner directories changed more recently than this are never treated as stale: a starting
+# process creates its directory a moment before it creates and locks the lock file
+STALE_GRACE_SECONDS = 60
+
+
+def default_scratch_dir():
+    """tmpfs where it is large enough for renders, otherwise the system temp dir"""
+    base = get_shared_memory_dir()
+    try:
+        if shutil.disk_usage(base).total < MIN_SHARED_MEMORY_MB * 1024 * 1024:
+            base = tempfile.gettempdir()
+    except OSError:
+        base = tempfile.gettempdir()
+    return os.path.join(base, "comfyui_blender")
+
+
+# Textures, renders and reports of in-flight jobs
+SCRATCH_DIR = os.environ.get("BLENDER_SCRATCH_DIR") or default_scratch_dir()
+
+
+def _lock_file(path, blocking=True):
+    """Open and lock `path`; returns the open file, or None if another process holds the lock"""
+    lock_file = open(path, "a+")
+    try:
+        try:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except ImportError:
+            import msvcrt
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class ScratchSpace:
+    """Unique job directories under `root`/<process owner>/job-N.
+
+    Each process owns one directory and holds a lock file in it for its
+    lifetime; owner directories whose lock is free (or missing, once they are
+    over a minute old) belong to a crashed or exited process and are removed
+    at startup. Released job directories are emptied and handed to the next
+    job instead of being recreated.
+    """
+
+    def __init__(self, root=SCRATCH_DIR, quota_mb=SCRATCH_QUOTA_MB, reuse=SCRATCH_REUSE):
+        self.root = root
+        self.quota = int(quota_mb * 1024 * 1024)
+        self.reuse = reuse
+        self.owner_dir = None
+        self._owner_lock = None
+        self._free = []
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def _ensure_owner(self):
+        if self.owner_dir is not None:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        self.cleanup_stale()
+        owner_dir = os.path.join(self.root, f"{os.getpid()}-{uuid.uuid4().hex[:8]}")
+        os.makedirs(owner_dir)
+        self._owner_lock = _lock_file(os.path.join(owner_dir, LOCK_NAME))
+        self.owner_dir = owner_dir
+
+    def cleanup_stale(self):
+        """Remove owner directories left behind by processes that are no longer running"""
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.root, name)
+            if path == self.owner_dir or not os.path.isdir(path):
+                continue
+            try:
+                if time.time() - os.stat(path).st_mtime < STALE_GRACE_SECONDS:
+                    continue
+            except OSError:
+                continue
+            lock_path = os.path.join(path, LOCK_NAME)
+            lock_file = _lock_file(lock_path, blocking=False) if os.path.exists(lock_path) else None
+            if os.path.exists(lock_path) and lock_file is None:
+                continue  # Owner is alive
+            size = _dir_size(path)
+            if lock_file is not None:
+                lock_file.close()
+            shutil.rmtree(path, ignore_errors=True)
+            print(f"Scratch space: removed stale {path} ({size / (1024 * 1024):.1f} MB)")
+
+    def usage(self):
+        """Bytes used under the scratch root by all processes"""
+        return _dir_size(self.root)
+
+    def limit(self, used):
+        """The quota, capped to what the scratch filesystem can actually hold"""
+        try:
+            free = shutil.disk_usage(self.root).free
+        except OSError:
+            return self.quota
+        return min(self.quota, int((used + free) * FILESYSTEM_SHARE))
+
+    def allocate(self):
+        """A fresh, empty directory for one job"""
+        with self._lock:
+            self._ensure_owner()
+            if self.quota > 0:
+                used = self.usage()
+                limit = self.limit(used)
+                if used >= limit:
+                    raise RuntimeError(f"Scratch space quota exceeded: {used / (1024 * 1024):.0f} MB used in "
+                                       f"{self.root}, limit {limit / (1024 * 1024):.0f} MB "
+                                       f"(BLENDER_SCRATCH_QUOTA_MB={self.quota / (1024 * 1024):.0f})")
+            if self._free:
+                return self._free.pop()
+            self._counter += 1
+            path = os.path.join(self.owner_dir, f"job-{self._counter}")
+            os.makedirs(path)
+            return path
+
+    def release(self, path):
+        """Empty a job directory and keep it for reuse"""
+        for name in os.listdir(path):
+            item = os.path.join(path, name)
+            try:
+                if os.path.isdir(item) and not os.path.islink(item):
+                    shutil.rmtree(item)
+                else:
+                    os.remove(item)
+            except OSError as e:
+                print(f"Warning: Could not clean up {item}: {e}")
+        with self._lock:
+            if len(self._free) < self.reuse:
+                self._free.append(path)
+                return
+        shutil.rmtree(path, ignore_errors=True)
+
+    @contextmanager
+    def job_dir(self):
+        path = self.allocate()
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    def shutdown(self):
+        with self._lock:
+            if self.owner_dir is None:
+                return
+            shutil.rmtree(self.owner_dir, ignore_errors=True)
+            if self._owner_lock is not None:
+                self._owner_lock.close()
+            self.owner_dir = None
+            self._free = []
+
+
+scratch_space = ScratchSpace()
+atexit.register(scratch_space.shutdown)
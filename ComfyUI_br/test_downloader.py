@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Tests of the parallel, resumable Blender downloader against a local HTTP server
+"""
+import io
+import os
+import re
+import hashlib
+import tarfile
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from blender_downloader import RangeDownload, download_and_install
+
+ARCHIVE_FOLDER = "blender-test-linux-x64"
+CHUNK_SIZE = 64 * 1024
+
+
+def make_archive():
+    """tar.xz with ARCHIVE_FOLDER/blender plus incompressible filler, a few chunks long"""
+    payload = io.BytesIO()
+    with tarfile.open(fileobj=payload, mode="w:xz") as tar:
+        for name, data in ((f"{ARCHIVE_FOLDER}/blender", b"#!/bin/sh\n"),
+                           (f"{ARCHIVE_FOLDER}/filler.bin", os.urandom(5 * CHUNK_SIZE + 123))):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return payload.getvalue()
+
+
+class ArchiveServer:
+    """Serves one archive and its .sha256 listing; `ranges=False` mimics a server without Range support"""
+
+    def __init__(self, archive, ranges=True, checksum=None):
+        self.archive = archive
+        self.ranges = ranges
+        self.checksum = checksum or hashlib.sha256(archive).hexdigest()
+        self.requests = []
+        self.fail_ranges_from = None  # Answer 500 to ranges starting at or after this offset
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(server.archive)))
+                if server.ranges:
+                    self.send_header("Accept-Ranges", "bytes")
+                self.end_headers()
+
+            def do_GET(self):
+                if self.path.endswith(".sha256"):
+                    body = f"{server.checksum}  blender-test.tar.xz\n".encode()
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+                server.requests.append(self.headers.get("Range"))
+                if not (server.ranges and match):
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(server.archive)))
+                    self.end_headers()
+                    self.wfile.write(server.archive)
+                    return
+                start, end = int(match.group(1)), int(match.group(2))
+                if server.fail_ranges_from is not None and start >= server.fail_ranges_from:
+                    self.send_error(500)
+                    return
+                body = server.archive[start:end + 1]
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(server.archive)}")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/blender-test.tar.xz"
+        self.checksum_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/blender-test.sha256"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def archive():
+    return make_archive()
+
+
+@pytest.fixture(autouse=True)
+def no_checksum_override(monkeypatch):
+    monkeypatch.delenv("BLENDER_SHA256", raising=False)
+
+
+def test_parallel_range_download_installs_and_verifies(archive):
+    server = ArchiveServer(archive)
+    install_root = tempfile.mkdtemp()
+    try:
+        download = RangeDownload(server.url, os.path.join(install_root, "direct.part"), workers=4, chunk_size=CHUNK_SIZE)
+        download.run()
+        with open(download.path, "rb") as f:
+            assert f.read() == archive
+        chunks = -(-len(archive) // CHUNK_SIZE)
+        assert len(server.requests) == chunks and all(server.requests)
+        download.cleanup()
+
+        install_path = download_and_install(server.url, install_root, ARCHIVE_FOLDER,
+                                            checksum_url=server.checksum_url, workers=4)
+        assert os.path.isfile(os.path.join(install_path, "blender"))
+        assert os.listdir(install_root) == [ARCHIVE_FOLDER]
+    finally:
+        server.close()
+
+
+def test_interrupted_download_resumes_from_state_file(archive):
+    server = ArchiveServer(archive)
+    path = os.path.join(tempfile.mkdtemp(), "blender-test.tar.xz.part")
+    try:
+        server.fail_ranges_from = 3 * CHUNK_SIZE
+        first = RangeDownload(server.url, path, workers=1, chunk_size=CHUNK_SIZE)
+        with pytest.raises(Exception):
+            first.run()
+        assert os.path.exists(path + ".json")
+
+        server.fail_ranges_from = None
+        server.requests.clear()
+        RangeDownload(server.url, path, workers=4, chunk_size=CHUNK_SIZE).run()
+        # Only the chunks the first attempt did not finish are fetched again
+        assert server.requests
+        assert all(int(request[6:].split("-")[0]) >= 3 * CHUNK_SIZE for request in server.requests)
+        with open(path, "rb") as f:
+            assert f.read() == archive
+    finally:
+        server.close()
+
+
+def test_checksum_mismatch_installs_nothing(archive):
+    server = ArchiveServer(archive, checksum="0" * 64)
+    install_root = tempfile.mkdtemp()
+    try:
+        with pytest.raises(IOError, match="SHA-256 mismatch"):
+            download_and_install(server.url, install_root, ARCHIVE_FOLDER,
+                                 checksum_url=server.checksum_url, workers=4)
+        assert os.listdir(install_root) == []
+    finally:
+        server.close()
+
+
+def test_server_without_range_support_downloads_in_one_stream(archive):
+    server = ArchiveServer(archive, ranges=False)
+    install_root = tempfile.mkdtemp()
+    try:
+        install_path = download_and_install(server.url, install_root, ARCHIVE_FOLDER,
+                                            checksum_url=server.checksum_url, workers=4)
+        assert os.path.isfile(os.path.join(install_path, "blender"))
+        assert server.requests == [None]
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
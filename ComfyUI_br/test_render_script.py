@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests of blender_render_script.py that run without Blender (bpy is stubbed)
+"""
+import os
+import sys
+import types
+import struct
+import tempfile
+import importlib.util
+from unittest import mock
+
+import numpy as np
+
+NODE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_PATH = os.path.join(NODE_DIR, "blender_render_script.py")
+
+
+class FakeImage:
+    def __init__(self, name, image_type, source):
+        self.name = name
+        self.type = image_type
+        self.source = source
+        self.pixels = mock.MagicMock()
+        self.colorspace_settings = mock.MagicMock()
+
+    def update(self):
+        pass
+
+
+class FakeImages(list):
+    """bpy.data.images: names get Blender's .001 suffixes while an image of that name exists"""
+
+    def _unique(self, name):
+        names = {img.name for img in self}
+        unique, counter = name, 0
+        while unique in names:
+            counter += 1
+            unique = f"{name}.{counter:03d}"
+        return unique
+
+    def new(self, name, width, height, alpha=False):
+        img = FakeImage(self._unique(name), 'UV_TEST', 'GENERATED')
+        self.append(img)
+        return img
+
+    def load(self, path, check_existing=False):
+        img = FakeImage(self._unique(os.path.basename(path)), 'IMAGE', 'FILE')
+        self.append(img)
+        return img
+
+    def remove(self, img):
+        list.remove(self, img)
+
+
+def load_script():
+    """A fresh copy of the render script on top of a stubbed bpy"""
+    bpy = mock.MagicMock()
+    bpy.data.filepath = ""
+    bpy.data.images = FakeImages([FakeImage("Render Result", 'RENDER_RESULT', 'VIEWER')])
+    bpy.app.version_string = "4.5.3"
+    bpy.app.handlers.render_stats = []
+    bpy.context.scene.render.threads = 8  # What Blender reports in AUTO mode
+    spec = importlib.util.spec_from_file_location("blender_render_script", SCRIPT_PATH)
+    script = importlib.util.module_from_spec(spec)
+    with mock.patch.dict(sys.modules, {"bpy": bpy}):
+        spec.loader.exec_module(script)
+    return script, bpy
+
+
+def write_raw(path, width=8, height=4):
+    with open(path, "wb") as f:
+        f.write(struct.pack("<4sII", b"RAW8", width, height))
+        f.write(np.zeros((height, width, 4), np.uint8).tobytes())
+    return path
+
+
+def test_warm_jobs_release_their_textures():
+    """Image count stays flat across warm jobs, for raw (GENERATED) and file textures alike"""
+    script, bpy = load_script()
+    pristine_images = set(img.name for img in bpy.data.images)
+    temp_dir = tempfile.mkdtemp()
+    raw_path = write_raw(os.path.join(temp_dir, "input_diffuse_0.rgba"))
+    png_path = os.path.join(temp_dir, "input_diffuse_1.png")
+
+    counts = []
+    for _ in range(4):
+        # What render_frames does per texture
+        script.release_job_images(pristine_images)
+        script.load_texture(raw_path)
+        script.load_texture(png_path)
+        counts.append(len(bpy.data.images))
+
+    assert counts == [counts[0]] * len(counts)
+    assert sorted(img.name for img in bpy.data.images) == ["Render Result", "input_diffuse_0.rgba", "input_diffuse_1.png"]
+    script.release_job_images(pristine_images)
+    assert [img.name for img in bpy.data.images] == ["Render Result"]
+
+
+def device(name, device_type):
+    return types.SimpleNamespace(name=name, type=device_type, use=False)
+
+
+def select(script, bpy, devices, **kwargs):
+    """Run select_device for one job with `devices` as Cycles' device list; returns (info, report)"""
+    prefs = bpy.context.preferences.addons["cycles"].preferences
+    prefs.devices = devices
+    scene = bpy.context.scene
+    script.report = script.new_report({})
+    info = script.select_device(scene, **kwargs)
+    report, script.report = script.report, None
+    return info, report
+
+
+def test_cpu_only_fallback_is_reported_on_every_job():
+    script, bpy = load_script()
+    scene = bpy.context.scene
+    for _ in range(2):  # The second job is served from the device cache
+        info, report = select(script, bpy, [device("CPU", 'CPU')], use_gpu=True)
+        assert info["backend"] == "CPU"
+        assert info["devices"] == [{"name": "CPU", "type": "CPU"}]
+        assert scene.cycles.device == "CPU"
+        assert any("falling back to CPU" in warning for warning in report["warnings"])
+
+
+def test_cpu_threads():
+    script, bpy = load_script()
+    scene = bpy.context.scene
+    info, report = select(script, bpy, [device("CPU", 'CPU')], use_gpu=False, threads=3)
+    assert (scene.render.threads_mode, scene.render.threads, info["threads"]) == ('FIXED', 3, 3)
+    assert report["warnings"] == []
+    # No count from the node: Blender decides instead of being pinned to the host's cores
+    select(script, bpy, [device("CPU", 'CPU')], use_gpu=False)
+    assert scene.render.threads_mode == 'AUTO'
+
+
+def test_gpu_selection_and_exclude_cpu():
+    script, bpy = load_script()
+    cpu, gpu = device("CPU", 'CPU'), device("GPU 0", 'CUDA')
+    info, report = select(script, bpy, [cpu, gpu], use_gpu=True)
+    assert info["backend"] == "CUDA"
+    assert bpy.context.scene.cycles.device == "GPU"
+    assert (cpu.use, gpu.use) == (True, True)
+    assert report["warnings"] == []
+
+    info, _ = select(script, bpy, [cpu, gpu], use_gpu=True, exclude_cpu=True)
+    assert (cpu.use, gpu.use) == (False, True)
+    assert info["devices"] == [{"name": "GPU 0", "type": "CUDA"}]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
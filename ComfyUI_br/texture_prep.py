@@ -0,0 +1,71 @@
+"""
+Downsample diffuse textures to the curtain's on-screen texel density before handing them to Blender
+"""
+import os
+import fnmatch
+
+import numpy as np
+from PIL import Image
+
+# Headroom over the measured density (folds, oblique views and filtering need more than 1 texel per pixel)
+TEXEL_MARGIN = float(os.environ.get("BLENDER_TEXEL_MARGIN", "1.5"))
+# Resizes that would keep more than this fraction of the texture are skipped
+MAX_SCALE = 0.9
+MIN_TEXTURE_SIZE = 64
+
+LANCZOS = getattr(Image, "Resampling", Image).LANCZOS
+
+
+def footprint_cameras(footprint, camera_specs):
+    """Camera names a job renders, resolved against the measured cameras; None if any is unknown"""
+    if not camera_specs:
+        return [footprint["default_camera"]] if footprint.get("default_camera") else None
+    measured = sorted({name for entry in footprint["objects"].values() for name in entry["density"]})
+    names = []
+    for spec in camera_specs:
+        if any(char in spec for char in "*?["):
+            matches = [name for name in measured if fnmatch.fnmatchcase(name, spec)]
+        else:
+            matches = [spec] if spec in measured else []
+        if not matches:
+            return None
+        names.extend(matches)
+    return names
+
+
+def texture_scale(footprint, texture_size, width_ratio, height_ratio, quality="custom", camera_specs=None):
+    """Factor (<= 1) that brings a (width, height) texture down to what the render can resolve"""
+    cameras = footprint_cameras(footprint, camera_specs)
+    if not cameras:
+        return 1.0
+    percentage = footprint["tier_percentages"].get(quality, footprint["resolution_percentage"]) / 100.0
+
+    width, height = texture_size
+    scale = 0.0
+    for entry in footprint["objects"].values():
+        densities = [entry["density"].get(name) for name in cameras]
+        densities = [density for density in densities if density]
+        if not densities:
+            continue
+        # Tiles across the UV range: Blender multiplies the Mapping scale by the node's ratios
+        if entry["mapping_scale"]:
+            repeats = (entry["mapping_scale"][0] * abs(width_ratio), entry["mapping_scale"][1] * abs(height_ratio))
+        else:
+            repeats = (1.0, 1.0)
+        if min(repeats) <= 0:
+            return 1.0
+        pixels_per_uv = max(densities) * percentage * TEXEL_MARGIN
+        scale = max(scale, pixels_per_uv / repeats[0] / width, pixels_per_uv / repeats[1] / height)
+
+    if scale == 0.0:
+        return 1.0  # No curtain is visible, or nothing was measured: leave the texture alone
+    scale = max(scale, MIN_TEXTURE_SIZE / min(width, height))
+    return scale if scale < MAX_SCALE else 1.0
+
+
+def downsample_texture(tex_array, scale):
+    """Lanczos-resize an [H,W,C] uint8 texture by `scale`"""
+    height, width = tex_array.shape[:2]
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    image = Image.fromarray(tex_array).resize(size, LANCZOS, reducing_gap=3.0)
+    return np.asarray(image)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the blank_page segmentation backends: speed and corner accuracy on synthetic photos
+"""
+import sys
+import time
+import argparse
+import statistics
+
+import cv2
+import numpy as np
+
+from utils import (
+    SEGMENTATION_METHODS, blank_page, to_grayscale, blur, to_edges,
+    find_vertices, reorder, downscale_for_detection, upscale_vertices
+)
+
+
+def synthetic_photo(seed, width, height):
+    """A page with text on a textured background, in random perspective; returns (image, true corners)"""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(40, 110, 3)
+    image = np.empty((height, width, 3), np.uint8)
+    image[:] = background
+    noise = cv2.GaussianBlur(rng.integers(0, 60, (height, width), dtype=np.uint8), (0, 0), 8)
+    image = cv2.add(image, cv2.merge([noise, noise, noise]))
+
+    jitter = lambda scale: rng.uniform(0.06, 0.16) * scale
+    corners = np.array([
+        [jitter(width), jitter(height)],
+        [width - jitter(width), jitter(height)],
+        [width - jitter(width), height - jitter(height)],
+        [jitter(width), height - jitter(height)],
+    ], np.float32)
+
+    page_w, page_h = 1700, 2200
+    page = np.full((page_h, page_w, 3), 235, np.uint8)
+    for line in range(36):
+        cv2.putText(page, "The quick brown fox jumps over the lazy dog", (120, 200 + line * 52),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.3, (25, 25, 25), 3)
+    source = np.array([[0, 0], [page_w - 1, 0], [page_w - 1, page_h - 1], [0, page_h - 1]], np.float32)
+    warp = cv2.getPerspectiveTransform(source, corners)
+    cv2.warpPerspective(page, warp, (width, height), image, borderMode=cv2.BORDER_TRANSPARENT)
+
+    # Uneven lighting and sensor noise
+    shade = np.linspace(0.8, 1.05, width, dtype=np.float32)[None, :, None]
+    image = np.clip(image * shade + rng.normal(0, 4, image.shape), 0, 255).astype(np.uint8)
+    return image, corners
+
+
+def detect(image, method, detection_resolution):
+    """Scanner steps 1-5 (as in DocumentScannerNode) with one segmentation backend"""
+    small, scale = downscale_for_detection(image, detection_resolution)
+    edges = to_edges(blur(to_grayscale(blank_page(small, method)), 5), 20, 70)
+    return upscale_vertices(find_vertices(edges), scale, image.shape)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare blank_page segmentation backends")
+    parser.add_argument("--methods", default=",".join(SEGMENTATION_METHODS))
+    parser.add_argument("--size", default="2000x1500", help="Photo size WxH")
+    parser.add_argument("--images", type=int, default=5)
+    parser.add_argument("--detection-resolution", type=int, default=0)
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.lower().split("x"))
+    photos = [synthetic_photo(seed, width, height) for seed in range(args.images)]
+    print(f"=== Segmentation benchmark: {args.images} photo(s) at {width}x{height}, "
+          f"detection at {args.detection_resolution or 'full'} resolution ===")
+    print(f"{'method':<20} {'median s':>9} {'mean err px':>12} {'max err px':>11} {'found':>6}")
+
+    for method in args.methods.split(","):
+        times, errors, found = [], [], 0
+        for image, corners in photos:
+            start = time.perf_counter()
+            vertices = detect(image, method, args.detection_resolution)
+            times.append(time.perf_counter() - start)
+            error = np.abs(reorder(vertices) - reorder(corners)).max()
+            errors.append(float(error))
+            found += error < 0.02 * max(width, height)
+        print(f"{method:<20} {statistics.median(times):>9.3f} {statistics.mean(errors):>12.1f} "
+              f"{max(errors):>11.1f} {found:>3}/{len(photos)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
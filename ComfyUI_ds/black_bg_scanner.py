@@ -1,7 +1,10 @@
 import cv2
 import numpy as np
 import torch
-from .utils import tensor_to_cv2, cv2_to_tensor, reorder, crop_out, enhance_image
+from .utils import (
+    batch_to_cv2, cv2_into, cv2_to_tensor, resize_to, pack_batch, BATCH_OUTPUTS,
+    reorder, crop_out, enhance_image, map_batch
+)
 
 
 def detect_object_on_black_background(image, threshold=30):
@@ -99,52 +102,87 @@ class BlackBackgroundScannerNode:
                 "return_mask": ("BOOLEAN", {
                     "default": False
                 })
+            },
+            "optional": {
+                # How results of different sizes are combined: padded canvas, resized, or a list at native size
+                "batch_output": (BATCH_OUTPUTS, {
+                    "default": "pad"
+                }),
+                # Size used by "resize" (0 = size of the first result)
+                "target_width": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 8
+                }),
+                "target_height": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 8
+                }),
+                # Images scanned in parallel (0 = DOCUMENT_SCANNER_WORKERS or one per CPU core)
+                "batch_workers": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 256,
+                    "step": 1
+                })
             }
         }
     
-    RETURN_TYPES = ("IMAGE", "IMAGE")
-    RETURN_NAMES = ("scanned_image", "detection_mask")
+    RETURN_TYPES = ("IMAGE", "IMAGE", "IMAGE")
+    RETURN_NAMES = ("scanned_image", "detection_mask", "scanned_list")
+    # scanned_list: one image per input (at its own size with batch_output "list")
+    OUTPUT_IS_LIST = (False, False, True)
     FUNCTION = "scan_black_background"
     
-    def scan_black_background(self, image, enhancement, background_threshold, return_mask):
+    def scan_black_background(self, image, enhancement, background_threshold, return_mask, batch_output="pad",
+                              target_width=0, target_height=0, batch_workers=0):
         """
         Main function for black background object scanning
         """
         try:
-            results = []
-            masks = []
+            # Convert the whole batch to OpenCV format at once
+            cv2_images = batch_to_cv2(image)
+            # Masks have the input size, so each worker writes its slot directly
+            mask_result = torch.empty(cv2_images.shape, dtype=torch.float32) if return_mask else None
+            # With a known target size, results are resized and written into the output by each worker
+            target_size = (target_width, target_height) if batch_output == "resize" and target_width and target_height else None
+            resized_result = None
+            if target_size:
+                resized_result = torch.empty((image.shape[0], target_height, target_width, 3), dtype=torch.float32)
             
-            # Process each image in batch
-            for i in range(image.shape[0]):
-                # Convert to OpenCV format
-                cv2_image = tensor_to_cv2(image[i:i+1])
-                
+            def scan(i):
                 # Process with optimized algorithm
                 processed, mask = scan_black_background_object(
-                    cv2_image, enhancement, background_threshold
+                    cv2_images[i], enhancement, background_threshold
                 )
                 
-                # Convert back to tensors
-                result_tensor = cv2_to_tensor(processed)
-                results.append(result_tensor)
-                
                 if return_mask:
-                    # Convert mask to 3-channel for visualization
-                    mask_3ch = np.stack([mask, mask, mask], axis=2)
-                    mask_tensor = cv2_to_tensor(mask_3ch)
-                    masks.append(mask_tensor)
+                    # Repeat the mask over 3 channels for visualization
+                    np.divide(mask[:, :, np.newaxis], np.float32(255.0), out=mask_result[i].numpy())
+                if resized_result is not None:
+                    cv2_into(resized_result, i, resize_to(processed, target_size))
+                    return None
+                return processed
             
-            # Combine results
-            final_result = torch.cat(results, dim=0)
+            # Process the batch in parallel; results come back in input order
+            results = map_batch(scan, image.shape[0], batch_workers)
             
-            if return_mask and masks:
-                mask_result = torch.cat(masks, dim=0)
+            # Combine results
+            final_result = resized_result if resized_result is not None else pack_batch(results, batch_output)
+            if batch_output == "list":
+                scanned_list = [cv2_to_tensor(result) for result in results]
             else:
+                scanned_list = [final_result[i:i+1] for i in range(final_result.shape[0])]
+            
+            if not return_mask:
                 mask_result = torch.zeros_like(final_result)
             
-            return (final_result, mask_result)
+            return (final_result, mask_result, scanned_list)
             
         except Exception as e:
             print(f"BlackBackgroundScanner error: {str(e)}")
             empty_mask = torch.zeros_like(image)
-            return (image, empty_mask)
\ No newline at end of file
+            return (image, empty_mask, [image[i:i+1] for i in range(image.shape[0])])
\ No newline at end of file
@@ -1,9 +1,11 @@
 import torch
 import numpy as np
 from .utils import (
-    tensor_to_cv2, cv2_to_tensor, blank_page, to_grayscale, blur, 
-    to_edges, find_vertices, crop_out, enhance_image
+    batch_to_cv2, cv2_into, cv2_to_tensor, resize_to, pack_batch, BATCH_OUTPUTS, blank_page, to_grayscale, blur, 
+    to_edges, find_vertices, crop_out, enhance_image, map_batch,
+    downscale_for_detection, upscale_vertices, refine_corners, SEGMENTATION_METHODS
 )
+import cv2
 
 
 class DocumentScannerNode:
@@ -45,71 +47,128 @@ class DocumentScannerNode:
                 "return_debug_edges": ("BOOLEAN", {
                     "default": False
                 })
+            },
+            "optional": {
+                # Page/background separation used by the preprocessing step ("grabcut" = original full-resolution GrabCut)
+                "segmentation": (list(SEGMENTATION_METHODS), {
+                    "default": "grabcut"
+                }),
+                # Run detection on a copy with this long side (px) and warp the full-resolution image (0 = full resolution)
+                "detection_resolution": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 8192,
+                    "step": 50
+                }),
+                # Snap the detected corners to sub-pixel positions on the full-resolution image
+                "refine_corners": ("BOOLEAN", {
+                    "default": False
+                }),
+                # How results of different sizes are combined: padded canvas, resized, or a list at native size
+                "batch_output": (BATCH_OUTPUTS, {
+                    "default": "pad"
+                }),
+                # Size used by "resize" (0 = size of the first result)
+                "target_width": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 8
+                }),
+                "target_height": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 8
+                }),
+                # Images scanned in parallel (0 = DOCUMENT_SCANNER_WORKERS or one per CPU core)
+                "batch_workers": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 256,
+                    "step": 1
+                })
             }
         }
     
-    RETURN_TYPES = ("IMAGE", "IMAGE")
-    RETURN_NAMES = ("scanned_image", "debug_edges")
+    RETURN_TYPES = ("IMAGE", "IMAGE", "IMAGE")
+    RETURN_NAMES = ("scanned_image", "debug_edges", "scanned_list")
+    # scanned_list: one image per input (at its own size with batch_output "list")
+    OUTPUT_IS_LIST = (False, False, True)
     FUNCTION = "scan_document"
     
     def scan_document(self, image, enhancement_method, edge_threshold_low, edge_threshold_high, 
-                     blur_kernel_size, skip_preprocessing, return_debug_edges):
+                     blur_kernel_size, skip_preprocessing, return_debug_edges, segmentation="grabcut",
+                     detection_resolution=0, refine_corners=False, batch_output="pad",
+                     target_width=0, target_height=0, batch_workers=0):
         """
         Main document scanning function
         """
         try:
-            results = []
-            debug_edges_batch = []
+            # Convert the whole batch to OpenCV format at once
+            cv2_images = batch_to_cv2(image)
+            # Debug edges have the input size, so each worker writes its slot directly
+            debug_result = torch.empty(cv2_images.shape, dtype=torch.float32) if return_debug_edges else None
+            # With a known target size, results are resized and written into the output by each worker
+            target_size = (target_width, target_height) if batch_output == "resize" and target_width and target_height else None
+            resized_result = None
+            if target_size:
+                resized_result = torch.empty((image.shape[0], target_height, target_width, 3), dtype=torch.float32)
             
-            # Process each image in the batch
-            for i in range(image.shape[0]):
-                # Convert tensor to OpenCV format
-                cv2_image = tensor_to_cv2(image[i:i+1])
-                
+            def scan(i):
                 # Document scanning pipeline
                 processed_image, edges_debug = self._process_single_image(
-                    cv2_image, enhancement_method, edge_threshold_low, 
-                    edge_threshold_high, blur_kernel_size, skip_preprocessing
+                    cv2_images[i], enhancement_method, edge_threshold_low, 
+                    edge_threshold_high, blur_kernel_size, skip_preprocessing,
+                    detection_resolution, refine_corners, segmentation
                 )
                 
-                # Convert back to tensor format
-                result_tensor = cv2_to_tensor(processed_image)
-                results.append(result_tensor)
-                
                 if return_debug_edges:
-                    edges_tensor = cv2_to_tensor(edges_debug)
-                    debug_edges_batch.append(edges_tensor)
+                    cv2_into(debug_result, i, edges_debug)
+                if resized_result is not None:
+                    cv2_into(resized_result, i, resize_to(processed_image, target_size))
+                    return None
+                return processed_image
             
-            # Combine batch results
-            final_result = torch.cat(results, dim=0)
+            # Process the batch in parallel; results come back in input order
+            results = map_batch(scan, image.shape[0], batch_workers)
             
-            if return_debug_edges and debug_edges_batch:
-                debug_result = torch.cat(debug_edges_batch, dim=0)
+            # Combine batch results
+            final_result = resized_result if resized_result is not None else pack_batch(results, batch_output)
+            if batch_output == "list":
+                scanned_list = [cv2_to_tensor(result) for result in results]
             else:
+                scanned_list = [final_result[i:i+1] for i in range(final_result.shape[0])]
+            
+            if not return_debug_edges:
                 # Return empty tensor with same batch size if no debug requested
                 debug_result = torch.zeros_like(final_result)
             
-            return (final_result, debug_result)
+            return (final_result, debug_result, scanned_list)
             
         except Exception as e:
             print(f"DocumentScanner error: {str(e)}")
             # Fallback: return original image
             empty_debug = torch.zeros_like(image)
-            return (image, empty_debug)
+            return (image, empty_debug, [image[i:i+1] for i in range(image.shape[0])])
     
     def _process_single_image(self, cv2_image, enhancement_method, edge_threshold_low, 
-                            edge_threshold_high, blur_kernel_size, skip_preprocessing):
+                            edge_threshold_high, blur_kernel_size, skip_preprocessing,
+                            detection_resolution=0, refine=False, segmentation="grabcut"):
         """
         Process a single image through the document scanning pipeline
         """
         try:
             original_image = cv2_image.copy()
             
+            # Detection (steps 1-5) runs on a downscaled copy; the warp uses the full-resolution original
+            detection_image, scale = downscale_for_detection(cv2_image, detection_resolution)
+            
             # Step 1: Preprocessing (optional)
             if not skip_preprocessing:
-                processed_image = blank_page(cv2_image)
+                processed_image = blank_page(detection_image, segmentation)
             else:
-                processed_image = cv2_image
+                processed_image = detection_image
             
             # Step 2: Convert to grayscale
             grayscale = to_grayscale(processed_image)
@@ -120,11 +179,18 @@ class DocumentScannerNode:
             # Step 4: Edge detection
             edges = to_edges(blurred, edge_threshold_low, edge_threshold_high)
             
-            # Create debug visualization of edges
-            edges_debug = np.stack([edges, edges, edges], axis=2)  # Convert to 3-channel for visualization
+            # Create debug visualization of edges (at the input size)
+            edges_full = edges
+            if scale != 1.0:
+                edges_full = cv2.resize(edges, (original_image.shape[1], original_image.shape[0]),
+                                        interpolation=cv2.INTER_NEAREST)
+            edges_debug = np.stack([edges_full, edges_full, edges_full], axis=2)  # Convert to 3-channel for visualization
             
-            # Step 5: Find document vertices
+            # Step 5: Find document vertices, in full-resolution coordinates
             vertices = find_vertices(edges)
+            vertices = upscale_vertices(vertices, scale, original_image.shape)
+            if refine:
+                vertices = refine_corners(original_image, vertices, max(5, round(2 / scale)))
             
             # Step 6: Perspective correction
             cropped = crop_out(original_image, vertices)
@@ -187,7 +253,7 @@ class SimpleDocumentScannerNode:
         
         # Use DocumentScannerNode with default parameters
         scanner = DocumentScannerNode()
-        result, _ = scanner.scan_document(
+        result, _, _ = scanner.scan_document(
             image=image,
             enhancement_method=enhancement_method,
             edge_threshold_low=20,
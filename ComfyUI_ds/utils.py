@@ -1,6 +1,91 @@
+import os
 import cv2
 import numpy as np
 import torch
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads used to scan a batch (0 = one per CPU core); OpenCV releases the GIL, so threads scale
+BATCH_WORKERS = int(os.environ.get("DOCUMENT_SCANNER_WORKERS", "0"))
+
+
+def resolve_workers(workers, batch_size):
+    """Worker count for a batch: `workers` (0 = BATCH_WORKERS, then CPU count), capped at the batch size"""
+    workers = workers or BATCH_WORKERS or os.cpu_count() or 1
+    return max(1, min(workers, batch_size))
+
+
+def map_batch(func, count, workers=0):
+    """Call func(i) for i in range(count) on a thread pool; results keep the batch order"""
+    workers = resolve_workers(workers, count)
+    if workers == 1:
+        return [func(i) for i in range(count)]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scanner") as pool:
+        return list(pool.map(func, range(count)))
+
+
+def batch_to_cv2(tensor_batch):
+    """Convert a ComfyUI [B,H,W,C] tensor to a [B,H,W,3] uint8 BGR array in one pass"""
+    array = tensor_batch.detach().cpu().numpy()
+    if array.ndim == 3:
+        array = array[np.newaxis]
+    # Scale and cast straight into the uint8 output (no float temporary), then swap channels in place
+    images = np.empty(array.shape[:3] + (3,), np.uint8)
+    np.multiply(array[..., :3], 255, out=images, casting="unsafe")
+    for image in images:
+        cv2.cvtColor(image, cv2.COLOR_RGB2BGR, dst=image)
+    return images
+
+
+def cv2_into(out, index, cv2_image, rgb=None):
+    """Write an OpenCV image into slot `index` of a preallocated float32 [B,H,W,3] tensor"""
+    rgb = cv2.cvtColor(cv2_image, cv2.COLOR_BGR2RGB, dst=rgb)
+    np.divide(rgb, np.float32(255.0), out=out[index].numpy())
+
+
+def cv2_to_batch(cv2_images, out=None):
+    """Convert same-sized OpenCV images to one [B,H,W,3] float32 RGB tensor, filling `out` if given"""
+    if out is None:
+        out = torch.empty((len(cv2_images),) + cv2_images[0].shape, dtype=torch.float32)
+    rgb = np.empty(cv2_images[0].shape, np.uint8)  # Channel-swap scratch shared by the whole batch
+    for index, cv2_image in enumerate(cv2_images):
+        cv2_into(out, index, cv2_image, rgb)
+    return out
+
+
+def same_shape(cv2_images):
+    return all(im.shape == cv2_images[0].shape for im in cv2_images)
+
+
+# How scanner nodes combine results of different sizes: pad onto a common black canvas,
+# resize to one size, or pad the batch and also emit each result at its own size as a list
+BATCH_OUTPUTS = ["pad", "resize", "list"]
+
+
+def resize_to(cv2_image, size):
+    """Resize to (width, height): area filter when shrinking, bilinear when enlarging"""
+    if (cv2_image.shape[1], cv2_image.shape[0]) == tuple(size):
+        return cv2_image
+    shrink = size[0] * size[1] < cv2_image.shape[0] * cv2_image.shape[1]
+    return cv2.resize(cv2_image, tuple(size), interpolation=cv2.INTER_AREA if shrink else cv2.INTER_LINEAR)
+
+
+def pack_batch(cv2_images, mode="pad", size=None):
+    """Combine OpenCV images of any size into one [B,H,W,3] tensor.
+
+    "resize" scales every image to `size` (width, height; default: the first image's size);
+    "pad" and "list" place them top-left on a black canvas as large as the largest one.
+    """
+    if mode == "resize":
+        size = size or (cv2_images[0].shape[1], cv2_images[0].shape[0])
+        return cv2_to_batch([resize_to(im, size) for im in cv2_images])
+    if same_shape(cv2_images):
+        return cv2_to_batch(cv2_images)
+    height = max(im.shape[0] for im in cv2_images)
+    width = max(im.shape[1] for im in cv2_images)
+    canvas = torch.zeros((len(cv2_images), height, width, 3), dtype=torch.float32)
+    for index, cv2_image in enumerate(cv2_images):
+        cv2_into(canvas[:, :cv2_image.shape[0], :cv2_image.shape[1]], index, cv2_image)
+    return canvas
 
 
 def tensor_to_cv2(tensor_image):
@@ -10,29 +95,13 @@ def tensor_to_cv2(tensor_image):
     if len(tensor_image.shape) == 4:
         # Take first image from batch
         tensor_image = tensor_image[0]
-    
-    # Convert from tensor to numpy array (0-1 range to 0-255)
-    cv2_image = tensor_image.cpu().numpy()
-    cv2_image = (cv2_image * 255).astype(np.uint8)
-    
-    # Convert RGB to BGR for OpenCV
-    cv2_image = cv2.cvtColor(cv2_image, cv2.COLOR_RGB2BGR)
-    
-    return cv2_image
+    return batch_to_cv2(tensor_image)[0]
 
 
 def cv2_to_tensor(cv2_image):
     """Convert OpenCV image to ComfyUI tensor format"""
-    # Convert BGR to RGB
-    rgb_image = cv2.cvtColor(cv2_image, cv2.COLOR_BGR2RGB)
-    
-    # Convert to float32 and normalize to 0-1 range
-    tensor_image = rgb_image.astype(np.float32) / 255.0
-    
-    # Convert to torch tensor and add batch dimension
-    tensor_image = torch.from_numpy(tensor_image).unsqueeze(0)
-    
-    return tensor_image
+    # BGR -> RGB, 0-255 -> 0-1, with a batch dimension of 1
+    return cv2_to_batch([cv2_image])
 
 
 def reorder(vertices):
@@ -47,22 +116,93 @@ def reorder(vertices):
     return reordered
 
 
-def blank_page(im):
-    """Remove text using morphological operations and GrabCut"""
-    kernel = np.ones((5,5), np.uint8)
-    img = cv2.morphologyEx(im, cv2.MORPH_CLOSE, kernel, iterations=3)
+# Long side of the copy that the downscaled GrabCut and watershed backends segment
+SEGMENTATION_SIDE = 400
+
 
+def _grabcut_mask(img, margin=20, iterations=5):
+    """GrabCut foreground mask (1 = page) seeded with a rectangle `margin` px inside the border"""
     mask = np.zeros(img.shape[:2], np.uint8)
     bgdModel = np.zeros((1,65), np.float64)
     fgdModel = np.zeros((1,65), np.float64)
-    rect = (20, 20, img.shape[1]-20, img.shape[0]-20)
-    
+    rect = (margin, margin, img.shape[1]-margin, img.shape[0]-margin)
+    cv2.grabCut(img, mask, rect, bgdModel, fgdModel, iterations, cv2.GC_INIT_WITH_RECT)
+    return np.where((mask==2)|(mask==0), 0, 1).astype('uint8')
+
+
+def _upsample_mask(mask, shape):
+    """Resize a 0/1 mask to `shape` (linear interpolation, then threshold), pulled in by half a source pixel.
+
+    The coarse mask edge may overshoot the page by up to a source pixel; the erosion keeps the
+    edge on the page, so Canny sees one closed outline instead of two broken ones.
+    """
+    resized = cv2.resize(mask.astype(np.float32), (shape[1], shape[0]), interpolation=cv2.INTER_LINEAR)
+    upsampled = (resized >= 0.5).astype(np.uint8)
+    radius = round(shape[1] / mask.shape[1] / 2)
+    if radius < 1:
+        return upsampled
+    return cv2.erode(upsampled, np.ones((2 * radius + 1, 2 * radius + 1), np.uint8))
+
+
+def _segment_grabcut(img):
+    return _grabcut_mask(img)
+
+
+def _segment_grabcut_downscaled(img):
+    small, scale = downscale_for_detection(img, SEGMENTATION_SIDE)
+    mask = _grabcut_mask(small, margin=max(1, round(20 * scale)))
+    return _upsample_mask(mask, img.shape)
+
+
+def _segment_threshold(img):
+    """Otsu split of the grayscale image; the component touching the border least is the page"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, mask = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    border = np.concatenate([mask[0], mask[-1], mask[:, 0], mask[:, -1]])
+    if border.mean() > 0.5:
+        mask = 1 - mask  # Page darker than its surroundings
+    # Keep the largest blob and fill its holes
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return np.ones(img.shape[:2], np.uint8)
+    filled = np.zeros(img.shape[:2], np.uint8)
+    cv2.drawContours(filled, [max(contours, key=cv2.contourArea)], -1, 1, thickness=cv2.FILLED)
+    return filled
+
+
+def _segment_watershed(img):
+    """Watershed from a background seed on the image border and a page seed in the center"""
+    small, _ = downscale_for_detection(img, SEGMENTATION_SIDE)
+    h, w = small.shape[:2]
+    markers = np.zeros((h, w), np.int32)
+    band = max(2, min(h, w) // 50)
+    markers[:band, :] = markers[-band:, :] = markers[:, :band] = markers[:, -band:] = 1
+    markers[h // 4:h - h // 4, w // 4:w - w // 4] = 2
+    cv2.watershed(small, markers)
+    # Boundary pixels (-1) sit on the page edge: grow the page region over them
+    page = cv2.dilate((markers == 2).astype(np.uint8), np.ones((3, 3), np.uint8))
+    return _upsample_mask(page, img.shape)
+
+
+# Foreground segmentation backends for blank_page; "grabcut" is the original full-resolution path
+SEGMENTATION_METHODS = {
+    "grabcut": _segment_grabcut,
+    "grabcut_downscaled": _segment_grabcut_downscaled,
+    "threshold": _segment_threshold,
+    "watershed": _segment_watershed,
+}
+
+
+def blank_page(im, method="grabcut"):
+    """Remove text using morphological operations and a foreground segmentation (GrabCut by default)"""
+    kernel = np.ones((5,5), np.uint8)
+    img = cv2.morphologyEx(im, cv2.MORPH_CLOSE, kernel, iterations=3)
+
     try:
-        cv2.grabCut(img, mask, rect, bgdModel, fgdModel, 5, cv2.GC_INIT_WITH_RECT)
-        mask2 = np.where((mask==2)|(mask==0), 0, 1).astype('uint8')
+        mask2 = SEGMENTATION_METHODS.get(method, _segment_grabcut)(img)
         img = img * mask2[:,:,np.newaxis]
     except:
-        # Fallback: return original if GrabCut fails
+        # Fallback: return original if segmentation fails
         pass
     
     return img
@@ -107,6 +247,50 @@ def find_vertices(im):
     return contour.reshape((4, 2))
 
 
+def downscale_for_detection(im, max_side):
+    """Copy of `im` with its long side at most `max_side` pixels (0 = unchanged); returns (image, scale)"""
+    h, w = im.shape[:2]
+    if not max_side or max(h, w) <= max_side:
+        return im, 1.0
+    scale = max_side / max(h, w)
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    return cv2.resize(im, size, interpolation=cv2.INTER_AREA), scale
+
+
+def upscale_vertices(vertices, scale, shape):
+    """Map vertices found on a downscaled copy back to full-resolution pixel coordinates"""
+    vertices = vertices.astype(np.float32)
+    if scale == 1.0:
+        return vertices
+    h, w = shape[:2]
+    # Pixel centers: x_full + 0.5 = (x_small + 0.5) / scale
+    vertices = (vertices + 0.5) / scale - 0.5
+    vertices[:, 0] = np.clip(vertices[:, 0], 0, w - 1)
+    vertices[:, 1] = np.clip(vertices[:, 1], 0, h - 1)
+    return vertices
+
+
+def refine_corners(im, vertices, search_radius=5):
+    """Sub-pixel corner positions near `vertices` on the full-resolution image"""
+    gray = im if im.ndim == 2 else cv2.cvtColor(im, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape
+    # The window has to stay inside the image around every corner
+    radius = int(min(search_radius, min(h, w) // 4))
+    if radius < 2:
+        return vertices
+    corners = vertices.astype(np.float32).reshape(-1, 1, 2).copy()
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 40, 0.01)
+    try:
+        cv2.cornerSubPix(gray, corners, (radius, radius), (-1, -1), criteria)
+    except cv2.error:
+        return vertices
+    refined = corners.reshape(-1, 2)
+    # A corner that wandered out of its window locked onto something else: keep the original
+    moved = np.abs(refined - vertices).max(axis=1) > radius
+    refined[moved] = vertices[moved]
+    return refined
+
+
 def crop_out(im, vertices):
     """Apply perspective transform to crop document"""
     vertices = reorder(vertices)